@@ -1,16 +1,40 @@
+import asyncio
 import logging
 import os
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
-import requests
-
-from clients.api_client import APIClient
+from clients.api_client import get_api_client
 from clients.anydesk_client import AnyDeskClient
 from clients.sheets_client import SheetsClient
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of AnyDesk sessions checked at the same time. AnyDeskClient
+# drives the real desktop (fullscreen window, screen capture, taskkill), so the
+# default is one session at a time; OCR of the previous capture still overlaps
+# with the next session. Raise this only on agents that can host several
+# sessions side by side.
+ANYDESK_CONCURRENCY = max(1, int(os.getenv("ANYDESK_CONCURRENCY", "1")))
+
+ANYDESK_SHEET_TITLE = "AnyDesk Status"
+ANYDESK_HEADERS = [
+    "License Key",
+    "License ID",
+    "AnyDesk ID",
+    "Host / Business Name",
+    "Dealer",
+    "Timezone",
+    "PS Version",
+    "UI Version",
+    "Memory",
+    "Storage",
+    "AnyDesk Status",
+    "Last Checked (UTC)",
+    "Notes",
+]
+
 
 def _derive_anydesk_password_from_license_id(license_id: str) -> Optional[str]:
     """
@@ -26,6 +50,16 @@ def _derive_anydesk_password_from_license_id(license_id: str) -> Optional[str]:
     if not license_id:
         return None
 
+    # Fast path: canonical 36-char GUID with dashes at fixed offsets
+    if (
+        len(license_id) == 36
+        and license_id[8] == "-"
+        and license_id[13] == "-"
+        and license_id[18] == "-"
+        and license_id[23] == "-"
+    ):
+        return license_id[19:]
+
     parts = license_id.split("-")
     if len(parts) < 5:
         logger.warning(
@@ -41,15 +75,9 @@ def _fetch_licenses_for_anydesk() -> List[Dict[str, Any]]:
     """
     Fetch licenses that are candidates for AnyDesk checking.
 
-    We call the backend's /api/license/getallwithduration endpoint directly,
-    using the same parameters you captured from the browser:
-
-        page=0
-        pageSize=0  (means "all")
-        piStatus=0
-        daysOfflineFrom=6
-        daysOfflineTo=30
-        etc.
+    Uses APIClient.get_offline_licenses (/api/license/getallwithduration)
+    on the process-wide client, so the login token and pooled connections
+    are shared with the other checks.
 
     This returns licenses that have been offline 6–30 days, including:
         - licenseId
@@ -59,81 +87,16 @@ def _fetch_licenses_for_anydesk() -> List[Dict[str, Any]]:
         - timezoneName
         ...
     """
-    base_url = os.getenv("NC_API_BASE_URL", "https://nctvapi.n-compass.online").rstrip("/")
-    username = os.getenv("NC_API_USERNAME")
-    password = os.getenv("NC_API_PASSWORD")
-
-    if not username or not password:
+    api = get_api_client()
+    if not api.username or not api.password:
         logger.error("NC_API_USERNAME or NC_API_PASSWORD not set; cannot fetch licenses for AnyDesk check.")
         return []
 
-    session = requests.Session()
-
-    # 1) Login to get a fresh JWT
-    login_url = f"{base_url}/api/account/login"
-    try:
-        resp = session.post(
-            login_url,
-            json={"username": username, "password": password},
-            timeout=30,
-        )
-    except requests.RequestException as e:
-        logger.error("Error logging into NC API for AnyDesk check: %s", e)
-        return []
-
-    if resp.status_code != 200:
-        logger.error("Login failed for AnyDesk check: status=%s body=%s", resp.status_code, resp.text[:300])
-        return []
-
-    token = resp.json().get("token")
-    if not token:
-        logger.error("Login response for AnyDesk check had no token: %s", resp.text[:300])
+    data = api.get_offline_licenses(days_from=6, days_to=30)
+    if not isinstance(data, dict):
+        logger.error("getallwithduration returned no usable data for AnyDesk check.")
         return []
 
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/json",
-    }
-
-    # 2) Call /api/license/getallwithduration with the same params as your curl
-    url = f"{base_url}/api/license/getallwithduration"
-
-    params = {
-        "page": 0,
-        "search": "",
-        "sortColumn": "TimeIn",
-        "sortOrder": "desc",
-        "pageSize": 0,          # backend uses 0 here to mean "all"
-        "includeAdmin": "false",
-        "piStatus": 0,
-        "daysOfflineFrom": 6,
-        "daysOfflineTo": 30,
-        "active": "",
-        "daysInstalled": "",
-        "timezone": "",
-        "dealerId": "",
-        "hostId": "",
-        "assigned": "",
-        "pending": "",
-        "online": "",
-        "isActivated": "",
-    }
-
-    try:
-        resp = session.get(url, headers=headers, params=params, timeout=60)
-    except requests.RequestException as e:
-        logger.error("Error calling getallwithduration for AnyDesk check: %s", e)
-        return []
-
-    if resp.status_code != 200:
-        logger.error(
-            "getallwithduration failed for AnyDesk check: status=%s body=%s",
-            resp.status_code,
-            resp.text[:300],
-        )
-        return []
-
-    data = resp.json() if resp.content else {}
     licenses = data.get("licenses") or []
     logger.info("Fetched %s offline licenses for AnyDesk check.", len(licenses))
     return licenses
@@ -158,56 +121,98 @@ def _init_anydesk_sheet() -> Optional[SheetsClient]:
         )
         return None
 
-    logger.info("Using spreadsheet ID %s for AnyDesk status.", target_id)
-    return SheetsClient(spreadsheet_id=target_id)
+    return _anydesk_sheets_client(target_id)
+
+
+@lru_cache(maxsize=1)
+def _anydesk_sheets_client(spreadsheet_id: str) -> SheetsClient:
+    """
+    Build the SheetsClient for `spreadsheet_id` once per process.
+
+    Keyed by the spreadsheet ID, so scheduled runs reuse the authorized
+    client instead of re-reading credentials and re-opening the spreadsheet.
+    """
+    logger.info("Using spreadsheet ID %s for AnyDesk status.", spreadsheet_id)
+    return SheetsClient(spreadsheet_id=spreadsheet_id)
 
 
 def _ensure_anydesk_worksheet(sheets: SheetsClient):
     """
     Get or create the 'AnyDesk Status' worksheet with proper headers.
-    """
-    ws = sheets.get_or_create_worksheet("AnyDesk Status", rows=2000, cols=6)
-    headers = [
-        "License Key",
-        "License ID",
-        "AnyDesk ID",
-        "Host / Business Name",
-        "Dealer",
-        "Timezone",
-        "PS Version",
-        "UI Version",
-        "Memory",
-        "Storage",
-        "AnyDesk Status",
-        "Last Checked (UTC)",
-        "Notes",
-    ]
 
-    sheets.ensure_headers(ws, headers)
+    Cheap on repeat runs: the client caches the worksheet handle and the
+    headers it has already verified, so only the first call hits the API.
+    """
+    ws = sheets.get_or_create_worksheet(ANYDESK_SHEET_TITLE, rows=2000, cols=6)
+    sheets.ensure_headers(ws, ANYDESK_HEADERS)
     return ws
 
 
+def _write_anydesk_rows(sheets: SheetsClient, rows: List[List[Any]]) -> None:
+    """
+    Upsert `rows` into the 'AnyDesk Status' worksheet keyed by license key.
+
+    Goes through with_worksheet so a tab deleted or renamed since the
+    handle was cached is re-created (with headers) instead of failing.
+    """
+    def write(ws) -> None:
+        sheets.ensure_headers(ws, ANYDESK_HEADERS)
+        sheets.upsert_rows(ws, rows, key_col=1)
+
+    sheets.with_worksheet(ANYDESK_SHEET_TITLE, write, rows=2000, cols=6)
+
+
+class _LicenseMeta(NamedTuple):
+    """Sheet metadata for one license, extracted once from the API payload."""
+
+    license_key: str
+    license_id: str
+    host_name: str
+    dealer_name: str
+    timezone_name: str
+    ps_version: str
+    ui_version: str
+    memory: str
+    storage: str
+
+
+def _extract_meta(lic: Dict[str, Any]) -> _LicenseMeta:
+    """Pull the AnyDesk Status sheet fields out of a license payload."""
+    get = lic.get
+    # Combine total & free storage into a single field
+    total_storage = str(get("totalStorage", ""))
+    free_storage = str(get("freeStorage", ""))
+    return _LicenseMeta(
+        license_key=str(get("licenseKey", "")),
+        license_id=str(get("licenseId", "")),
+        host_name=str(get("hostName") or get("businessName") or ""),
+        dealer_name=str(get("dealerName") or get("dealerId") or ""),
+        timezone_name=str(get("timezoneName") or ""),
+        ps_version=str(get("serverVersion", "")),
+        ui_version=str(get("uiVersion", "")),
+        memory=str(get("memory", "")),
+        storage=(
+            f"{total_storage} (free {free_storage})"
+            if total_storage or free_storage
+            else ""
+        ),
+    )
+
+
 def _update_anydesk_row(
-    sheets: Optional[SheetsClient],
-    ws,
+    rows: Dict[str, List[Any]],
+    meta: _LicenseMeta,
     *,
-    license_key: str,
-    license_id: str,
     anydesk_id: str,
     status: str,
-    host_name: str,
-    dealer_name: str,
-    timezone_name: str,
-    ps_version: str,
-    ui_version: str,
-    memory: str,
-    storage: str,
+    timestamp: str,
     notes: str = "",
 ) -> None:
     """
-    Upsert a row in the AnyDesk Status sheet for a given license.
+    Queue the AnyDesk Status row for a given license in `rows`.
 
-    Key = License Key (column 1).
+    Key = License Key (column 1); a later row for the same key replaces the
+    earlier one.
 
     Columns:
       1  License Key
@@ -224,34 +229,24 @@ def _update_anydesk_row(
       12 Last Checked (UTC)
       13 Notes
     """
-    if sheets is None or ws is None:
-        return
-
-    timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S UTC")
-
     values = [
-        license_key,
-        license_id,
+        meta.license_key,
+        meta.license_id,
         anydesk_id,
-        host_name,
-        dealer_name,
-        timezone_name,
-        ps_version,
-        ui_version,
-        memory,
-        storage,
+        meta.host_name,
+        meta.dealer_name,
+        meta.timezone_name,
+        meta.ps_version,
+        meta.ui_version,
+        meta.memory,
+        meta.storage,
         status,
         timestamp,
         notes,
     ]
 
-    # Use upsert so each license has a single row that gets updated each run
-    sheets.upsert_row(
-        ws,
-        key_value=license_key,
-        values=values,
-        key_col=1,  # column 1 = License Key
-    )
+    # Keyed by License Key so each license keeps a single row across runs
+    rows[meta.license_key] = values
 
 
 def _extract_anydesk_info(license_data: Dict[str, Any]) -> Optional[Dict[str, str]]:
@@ -292,31 +287,129 @@ def _extract_anydesk_info(license_data: Dict[str, Any]) -> Optional[Dict[str, st
     return {"id": anydesk_id, "password": password}
 
 
-def run_anydesk_check() -> None:
+def _prepare_anydesk_sheet() -> Optional[Tuple[SheetsClient, Any]]:
     """
-    Main entry point for AnyDesk connectivity check.
+    Initialize Sheets (optional) and return the client and the
+    'AnyDesk Status' worksheet.
+
+    Returns None when no spreadsheet ID is configured.
+    """
+    sheets = _init_anydesk_sheet()
+    if sheets is None:
+        return None
+    return sheets, _ensure_anydesk_worksheet(sheets)
+
+
+def _record_skipped(
+    meta: _LicenseMeta,
+    *,
+    rows: Dict[str, List[Any]],
+    status_counts: Dict[str, int],
+    run_ts: str,
+) -> None:
+    """Count a license as skipped and queue its "Skipped" row in `rows`."""
+    status_counts["Skipped"] += 1
+    logger.info(
+        "Skipping license %s: missing AnyDesk ID or password.",
+        meta.license_key,
+    )
+    # Still upsert a row with status "Skipped" so it's visible
+    _update_anydesk_row(
+        rows,
+        meta,
+        anydesk_id="",
+        status="Skipped",
+        timestamp=run_ts,
+        notes="Missing AnyDesk ID or password",
+    )
+
+
+async def _process_license(
+    lic: Dict[str, Any],
+    *,
+    anydesk_client: AnyDeskClient,
+    rows: Dict[str, List[Any]],
+    sem: asyncio.Semaphore,
+    status_counts: Dict[str, int],
+    run_ts: str,
+) -> None:
+    """
+    Check a single license and queue its AnyDesk Status row in `rows`.
+
+    Only the desktop-bound AnyDesk session is gated by `sem`; OCR of the
+    captured screenshot runs on the client's OCR pool after the slot is free.
+    """
+    meta = _extract_meta(lic)
+    license_key = meta.license_key
+
+    info = _extract_anydesk_info(lic)
+    if not info:
+        _record_skipped(meta, rows=rows, status_counts=status_counts, run_ts=run_ts)
+        return
+
+    anydesk_id = info["id"]
+    password = info["password"]
+
+    async with sem:
+        logger.info(
+            "Checking AnyDesk connectivity for license %s (ID=%s)...",
+            license_key,
+            anydesk_id,
+        )
+        # The session drives the desktop and blocks, so run it off the loop
+        screenshot = await asyncio.to_thread(
+            anydesk_client.capture_session,
+            anydesk_id,
+            password,
+        )
+
+    # OCR happens after the desktop slot is released
+    if screenshot is None:
+        status = "Errored"
+    else:
+        status = await anydesk_client.classify_status_async(screenshot)
+
+    status_counts.setdefault(status, 0)
+    status_counts[status] += 1
+
+    logger.info(
+        "License %s AnyDesk status: %s",
+        license_key,
+        status,
+    )
+
+    _update_anydesk_row(
+        rows,
+        meta,
+        anydesk_id=anydesk_id,
+        status=status,
+        timestamp=run_ts,
+        notes="",
+    )
+
+
+async def run_anydesk_check_async() -> None:
+    """
+    Async implementation of the AnyDesk connectivity check.
 
     Flow:
       1. Use APIClient to fetch licenses.
       2. For each license, extract AnyDesk ID + password (derived from licenseId).
-      3. Use AnyDeskClient to open a session and classify the result.
+      3. Use AnyDeskClient to open a session and classify the result, with at
+         most ANYDESK_CONCURRENCY sessions in flight at once.
       4. Log a summary of statuses and write/update rows in the
          'AnyDesk Status' worksheet when a Sheets ID is configured.
-
-    This function is intended to run ONLY on a Windows agent with:
-      - AnyDesk installed & on PATH
-      - An active desktop session
-      - Tesseract configured for pytesseract
     """
     logger.info("Starting AnyDesk connectivity check...")
 
     anydesk_client = AnyDeskClient()
 
-    # Initialize Sheets (optional – you already have this wired)
-    sheets: Optional[SheetsClient] = _init_anydesk_sheet()
-    ws = _ensure_anydesk_worksheet(sheets) if sheets is not None else None
-
-    licenses = _fetch_licenses_for_anydesk()
+    # Sheets setup and the license fetch are independent round-trips, so
+    # run them side by side instead of one after the other.
+    sheet, licenses = await asyncio.gather(
+        asyncio.to_thread(_prepare_anydesk_sheet),
+        asyncio.to_thread(_fetch_licenses_for_anydesk),
+    )
     if not licenses:
         logger.info("No licenses to process for AnyDesk check.")
         return
@@ -329,96 +422,81 @@ def run_anydesk_check() -> None:
         "Skipped": 0,
     }
 
+    # One "Last Checked (UTC)" value for every row written by this run
+    run_ts = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+    # AnyDesk Status rows of this run by License Key, written in one batch
+    rows: Dict[str, List[Any]] = {}
+
+    # Licenses without an AnyDesk ID never reach a session; record them
+    # up front instead of scheduling a task for each one.
+    candidates: List[Dict[str, Any]] = []
     for lic in licenses:
-        license_key = str(lic.get("licenseKey", ""))
-        license_id = str(lic.get("licenseId", ""))
-
-        # Extra metadata for the sheet
-        host_name = str(
-            lic.get("hostName")
-            or lic.get("businessName")
-            or ""
-        )
-        dealer_name = str(
-            lic.get("dealerName")
-            or lic.get("dealerId")
-            or ""
-        )
-        timezone_name = str(lic.get("timezoneName") or "")
-        ps_version = str(lic.get("serverVersion", ""))
-        ui_version = str(lic.get("uiVersion", ""))
-        memory = str(lic.get("memory", ""))
-        # Combine total & free storage into a single field
-        total_storage = str(lic.get("totalStorage", ""))
-        free_storage = str(lic.get("freeStorage", ""))
-        storage = (
-            f"{total_storage} (free {free_storage})"
-            if total_storage or free_storage
-            else ""
-        )
+        if str(lic.get("anydeskId") or "").strip():
+            candidates.append(lic)
+        else:
+            _record_skipped(
+                _extract_meta(lic),
+                rows=rows,
+                status_counts=status_counts,
+                run_ts=run_ts,
+            )
+    logger.info(
+        "%s of %s licenses have an AnyDesk ID.",
+        len(candidates),
+        len(licenses),
+    )
 
-        info = _extract_anydesk_info(lic)
-        if not info:
-            status_counts["Skipped"] += 1
-            logger.info(
-                "Skipping license %s: missing AnyDesk ID or password.",
-                license_key,
+    sem = asyncio.Semaphore(ANYDESK_CONCURRENCY)
+    tasks = [
+        asyncio.create_task(
+            _process_license(
+                lic,
+                anydesk_client=anydesk_client,
+                rows=rows,
+                sem=sem,
+                status_counts=status_counts,
+                run_ts=run_ts,
             )
-            # Still upsert a row with status "Skipped" so it's visible
-            _update_anydesk_row(
-                sheets,
-                ws,
-                license_key=license_key,
-                license_id=license_id,
-                anydesk_id="",
-                status="Skipped",
-                host_name=host_name,
-                dealer_name=dealer_name,
-                timezone_name=timezone_name,
-                ps_version=ps_version,
-                ui_version=ui_version,
-                memory=memory,
-                storage=storage,
-                notes="Missing AnyDesk ID or password",
+        )
+        for lic in candidates
+    ]
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+
+    for lic, result in zip(candidates, results):
+        if isinstance(result, Exception):
+            status_counts["Errored"] += 1
+            logger.error(
+                "Error while processing license %s: %s",
+                lic.get("licenseKey"),
+                result,
+                exc_info=result,
             )
-            continue
 
-        anydesk_id = info["id"]
-        password = info["password"]
+    # One batched write for the whole run instead of a round-trip per
+    # license. upsert_rows reads the key column itself, right before
+    # writing, so rows added, sorted or deleted by hand during the run
+    # are respected.
+    if sheet is not None and rows:
+        sheets, _ws = sheet
+        logger.info("Writing %s AnyDesk Status rows.", len(rows))
+        await asyncio.to_thread(_write_anydesk_rows, sheets, list(rows.values()))
 
-        logger.info(
-            "Checking AnyDesk connectivity for license %s (ID=%s)...",
-            license_key,
-            anydesk_id,
-        )
+    logger.info("AnyDesk connectivity check complete. Summary:")
+    for status, count in status_counts.items():
+        logger.info("  %s: %s", status, count)
 
-        status = anydesk_client.check_session(anydesk_id, password)
-        status_counts.setdefault(status, 0)
-        status_counts[status] += 1
 
-        logger.info(
-            "License %s AnyDesk status: %s",
-            license_key,
-            status,
-        )
+def run_anydesk_check() -> None:
+    """
+    Main entry point for AnyDesk connectivity check.
 
-        _update_anydesk_row(
-            sheets,
-            ws,
-            license_key=license_key,
-            license_id=license_id,
-            anydesk_id=anydesk_id,
-            status=status,
-            host_name=host_name,
-            dealer_name=dealer_name,
-            timezone_name=timezone_name,
-            ps_version=ps_version,
-            ui_version=ui_version,
-            memory=memory,
-            storage=storage,
-            notes="",
-        )
+    Thin sync wrapper around `run_anydesk_check_async` so the scheduler and
+    the helper scripts can keep calling it as a plain function.
 
-    logger.info("AnyDesk connectivity check complete. Summary:")
-    for status, count in status_counts.items():
-        logger.info("  %s: %s", status, count)
+    This function is intended to run ONLY on a Windows agent with:
+      - AnyDesk installed & on PATH
+      - An active desktop session
+      - Tesseract configured for pytesseract
+    """
+    asyncio.run(run_anydesk_check_async())
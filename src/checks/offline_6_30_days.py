@@ -1,13 +1,77 @@
 import logging
-from typing import Any, Dict, List
+import math
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
 
-from clients.api_client import APIClient
+from clients.api_client import APIClient, get_api_client
 from clients.sheets_client import SheetsClient
 
 logger = logging.getLogger(__name__)
 
 SHEET_TAB_NAME = "Offline 6-30 Days"
 
+SHEET_HEADERS = [
+    "License ID",
+    "License Key",
+    "Timezone",
+    "Days Offline",
+    "PiStatus",
+    "Dealer",
+    "Host",
+]
+
+# How many license pages are requested at the same time.
+PAGE_FETCH_CONCURRENCY = 8
+
+
+def _offline_params(page: int, page_size: int) -> Dict[str, Any]:
+    """Query params for one page of the offline 6–30 days listing."""
+    return {
+        "page": page,
+        "pageSize": page_size,
+        "search": "",
+        "sortColumn": "TimeIn",
+        "sortOrder": "desc",
+        "includeAdmin": "false",
+        "piStatus": 0,
+        "daysOfflineFrom": 6,
+        "daysOfflineTo": 30,
+        "active": "",
+        "daysInstalled": "",
+        "timezone": "",
+        "dealerId": "",
+        "hostId": "",
+        "assigned": "",
+        "pending": "",
+        "online": "",
+        "isActivated": "",
+        "isFavorite": "",
+        "serverVersion": "",
+        "uiVersion": "",
+        "piOrder": "",
+    }
+
+
+def _total_count(data: Any) -> Optional[int]:
+    """
+    Return the total number of matching licenses if the response reports it.
+
+    Looks for the usual count fields at the top level and under `paging`.
+    """
+    if not isinstance(data, dict):
+        return None
+
+    candidates = [data]
+    if isinstance(data.get("paging"), dict):
+        candidates.append(data["paging"])
+
+    for container in candidates:
+        for key in ("totalCount", "totalRecords", "total"):
+            value = container.get(key)
+            if isinstance(value, int) and value >= 0:
+                return value
+    return None
+
 
 def _fetch_offline_licenses(api: APIClient) -> List[Dict[str, Any]]:
     """
@@ -21,46 +85,28 @@ def _fetch_offline_licenses(api: APIClient) -> List[Dict[str, Any]]:
           &active=&daysInstalled=&timezone=&dealerId=&hostId=
           &assigned=&pending=&online=&isActivated=&isFavorite=
           &serverVersion=&uiVersion=&piOrder=
+
+    Page 1 is fetched on its own so the client logs in exactly once. If it
+    reports a total count, the remaining pages are all requested at once;
+    otherwise pages are requested PAGE_FETCH_CONCURRENCY at a time until an
+    empty page shows up. Both paths share the one APIClient session.
     """
     licenses: List[Dict[str, Any]] = []
-    page = 1
     page_size = 100  # backend confirmed we can change this
 
-    while True:
-        params = {
-            "page": page,
-            "pageSize": page_size,
-            "search": "",
-            "sortColumn": "TimeIn",
-            "sortOrder": "desc",
-            "includeAdmin": "false",
-            "piStatus": 0,
-            "daysOfflineFrom": 6,
-            "daysOfflineTo": 30,
-            "active": "",
-            "daysInstalled": "",
-            "timezone": "",
-            "dealerId": "",
-            "hostId": "",
-            "assigned": "",
-            "pending": "",
-            "online": "",
-            "isActivated": "",
-            "isFavorite": "",
-            "serverVersion": "",
-            "uiVersion": "",
-            "piOrder": "",
-        }
-
-        data = api.get_licenses(params=params)
+    def fetch_page(page: int) -> Optional[Any]:
+        return api.get_licenses(params=_offline_params(page, page_size))
+
+    def collect(page: int, data: Optional[Any]) -> bool:
+        """Add one page of results; return False once pagination is done."""
         if not data:
             logger.warning("No data returned for offline licenses on page %s.", page)
-            break
+            return False
 
         page_licenses = data.get("licenses", [])
         if not page_licenses:
             logger.info("No more offline licenses (page %s).", page)
-            break
+            return False
 
         logger.info(
             "Fetched %s offline licenses (6–30 days) on page %s.",
@@ -68,9 +114,56 @@ def _fetch_offline_licenses(api: APIClient) -> List[Dict[str, Any]]:
             page,
         )
         licenses.extend(page_licenses)
-        page += 1
-
-    return licenses
+        return True
+
+    first_page = fetch_page(1)
+    if not collect(1, first_page):
+        return licenses
+
+    total = _total_count(first_page)
+    if total is not None:
+        # The total is known, so fetch exactly the remaining pages at once.
+        last_page = math.ceil(total / page_size)
+        if last_page < 2:
+            return licenses
+
+        pages_data: Dict[int, Optional[Any]] = {}
+        with ThreadPoolExecutor(max_workers=PAGE_FETCH_CONCURRENCY) as pool:
+            futures = {
+                pool.submit(fetch_page, p): p for p in range(2, last_page + 1)
+            }
+            for future in as_completed(futures):
+                pages_data[futures[future]] = future.result()
+
+        for p in sorted(pages_data):
+            if not collect(p, pages_data[p]):
+                break
+        return licenses
+
+    # No total in the payload: request pages in windows until one is empty.
+    page = 2
+    with ThreadPoolExecutor(max_workers=PAGE_FETCH_CONCURRENCY) as pool:
+        while True:
+            pages = range(page, page + PAGE_FETCH_CONCURRENCY)
+            for p, data in zip(pages, pool.map(fetch_page, pages)):
+                if not collect(p, data):
+                    return licenses
+            page += PAGE_FETCH_CONCURRENCY
+
+
+def _sheet_row(lic: Dict[str, Any]) -> List[Any]:
+    """Build one sheet row (in SHEET_HEADERS order) from a license payload."""
+    get = lic.get
+    return [
+        str(get("licenseId", "")),
+        str(get("licenseKey", "")),
+        str(get("timezone", "") or get("timezoneName", "")),
+        # daysOffline field name is a guess; adjust if your payload uses a different key
+        get("daysOffline", ""),
+        get("piStatus", ""),
+        get("dealerName", "") or get("dealer", ""),
+        get("hostName", "") or get("host", ""),
+    ]
 
 
 def run_offline_6_30_check() -> None:
@@ -86,7 +179,7 @@ def run_offline_6_30_check() -> None:
     """
     logger.info("Starting offline 6–30 days check...")
 
-    api = APIClient()
+    api = get_api_client()
     sheets = SheetsClient()
 
     offline_licenses = _fetch_offline_licenses(api)
@@ -94,48 +187,15 @@ def run_offline_6_30_check() -> None:
         logger.info("No offline 6–30 day licenses found.")
         return
 
-    ws = sheets.get_or_create_worksheet(SHEET_TAB_NAME, rows=2000, cols=7)
-    headers = [
-        "License ID",
-        "License Key",
-        "Timezone",
-        "Days Offline",
-        "PiStatus",
-        "Dealer",
-        "Host",
-    ]
-    sheets.ensure_headers(ws, headers)
-
-    # We’ll keep it simple: wipe and re-write the entire sheet for now
-    # (except headers), so this tab always represents the latest snapshot.
-    # If you prefer upserts keyed by license ID instead, we can change it later.
-    existing_values = ws.get_all_values()
-    # Delete all rows after the header
-    if len(existing_values) > 1:
-        ws.delete_rows(2, len(existing_values))
-
-    rows: List[List[Any]] = []
-    for lic in offline_licenses:
-        license_id = str(lic.get("licenseId", ""))
-        license_key = str(lic.get("licenseKey", ""))
-        timezone = str(lic.get("timezone", "") or lic.get("timezoneName", ""))
-        # daysOffline field name is a guess; adjust if your payload uses a different key
-        days_offline = lic.get("daysOffline", "")
-        pi_status = lic.get("piStatus", "")
-        dealer = lic.get("dealerName", "") or lic.get("dealer", "")
-        host = lic.get("hostName", "") or lic.get("host", "")
-
-        rows.append([
-            license_id,
-            license_key,
-            timezone,
-            days_offline,
-            pi_status,
-            dealer,
-            host,
-        ])
-
-    if rows:
-        ws.append_rows(rows, value_input_option="USER_ENTERED")
+    rows = [_sheet_row(lic) for lic in offline_licenses]
+
+    # This tab always represents the latest snapshot: headers and rows are
+    # rewritten in one call and leftovers from a longer run are cleared.
+    sheets.with_worksheet(
+        SHEET_TAB_NAME,
+        lambda ws: sheets.replace_all(ws, SHEET_HEADERS, rows),
+        rows=2000,
+        cols=7,
+    )
 
     logger.info("Offline 6–30 days check complete. Wrote %s rows.", len(rows))
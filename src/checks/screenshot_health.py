@@ -2,22 +2,40 @@ import logging
 import os
 import re
 import json
+import hashlib
+import shlex
+import subprocess
+import threading
 
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, time, timedelta
+from functools import lru_cache
 from io import BytesIO
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from operator import attrgetter, itemgetter
+from typing import Any, Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
 from pathlib import Path
 
-import gspread
 import pytesseract
 import pytz
 import logging
 import requests
-from google.oauth2.service_account import Credentials
-from PIL import Image
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from PIL import Image, ImageStat
 
-from clients.api_client import APIClient
-from clients.sheets_client import SheetsClient
+from clients.api_client import APIClient, get_api_client
+from clients.sheets_client import SheetsClient, open_spreadsheet
+
+# Parallelism comes from the license worker pool, so keep each tesseract
+# process single-threaded instead of letting OpenMP oversubscribe the CPU.
+# Set before tesserocr is imported: libtesseract reads it when it loads.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+try:
+    from tesserocr import OEM, PSM, PyTessBaseAPI
+except ImportError:  # pragma: no cover - tesserocr is optional
+    PyTessBaseAPI = None
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +52,23 @@ ERROR_MESSAGES = {
     "downloading updates",
 }
 
+# All error phrases as one case-insensitive alternation, so each OCR text
+# is scanned once, without lowercasing a copy first. Longest first so a
+# phrase is never shadowed by a shorter one sharing its prefix.
+_ERROR_MESSAGES_RE = re.compile(
+    "|".join(re.escape(msg) for msg in sorted(ERROR_MESSAGES, key=len, reverse=True)),
+    re.IGNORECASE,
+)
+
+# Daily tabs are named YYYY-MM-DD
+_DATE_TAB_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+# Everything that is not a digit, stripped from screenshot filenames
+_NON_DIGITS_RE = re.compile(r"\D")
+
+# Old-format store hours: "10:00 AM", "6:00 PM" or 24-hour "18:00"
+_CLOCK_TIME_RE = re.compile(r"(\d{1,2}):(\d{1,2})(?:\s+([AaPp][Mm]))?")
+
 # Timezone used for naming the daily sheet and the "Last Checked" column.
 # Default is Texas time (US/Central). You can override this with NC_MONITORING_TZ.
 MONITORING_TZ_NAME = os.getenv("NC_MONITORING_TZ", "US/Central")
@@ -57,11 +92,86 @@ if not TESSERACT_CMD:
 if TESSERACT_CMD:
     pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
 
+# Only the characters the error phrases can contain
+OCR_CHAR_WHITELIST = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789,."
+
+# LSTM engine, one uniform text block, restricted charset. Pair with
+# tessdata_fast models (TESSDATA_PREFIX). Used by the pytesseract fallback.
+TESSERACT_CONFIG = os.getenv(
+    "SCREENSHOT_TESSERACT_CONFIG",
+    f"--oem 1 --psm 6 -l eng -c tessedit_char_whitelist={OCR_CHAR_WHITELIST}",
+)
+
+# One resident tesserocr engine per worker thread (model loaded once)
+_OCR_LOCAL = threading.local()
+
+# OCR runs at most this many at once, one per core by default. License
+# workers beyond that keep downloading and checking black frames while
+# they wait for a slot, instead of oversubscribing the CPU with tesseract.
+OCR_CONCURRENCY = max(1, int(os.getenv("SCREENSHOT_OCR_CONCURRENCY", str(os.cpu_count() or 1))))
+_OCR_SLOTS = threading.BoundedSemaphore(OCR_CONCURRENCY)
+
+# Screenshots per license that are downloaded and analyzed
+SCREENSHOTS_PER_LICENSE = 4
+
+# Black frames among those that mark a license OPEN_HOURS_BLACK_SCREEN.
+# Once reached the status is settled, so the remaining frames skip OCR.
+BLACK_SCREENS_FOR_STATUS = 3
+
+# Screenshots taller than this are downscaled before OCR. Tesseract time
+# grows with pixel count, and the error phrases stay legible at this size.
+OCR_MAX_HEIGHT = 800
+
+# Licenses analyzed at the same time. The work is HTTP I/O and the tesseract
+# subprocess, both of which release the GIL, so threads scale well here.
+SCREENSHOT_HEALTH_WORKERS = max(1, int(os.getenv("SCREENSHOT_HEALTH_WORKERS", "8")))
+
+# Shared keep-alive session for screenshot downloads, so repeated fetches
+# from the screenshot host reuse connections instead of new TLS handshakes.
+# Transient connection errors and gateway errors are retried briefly.
+_IMAGE_SESSION = requests.Session()
+_IMAGE_ADAPTER = HTTPAdapter(
+    pool_connections=32,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+    ),
+)
+_IMAGE_SESSION.mount("https://", _IMAGE_ADAPTER)
+_IMAGE_SESSION.mount("http://", _IMAGE_ADAPTER)
+# JPEGs are already compressed; don't ask the CDN to gzip them again
+_IMAGE_SESSION.headers["Accept-Encoding"] = "identity"
+
+# (connect, read) timeout: fail fast on unreachable hosts, allow slow bodies
+IMAGE_DOWNLOAD_TIMEOUT = (5, 25)
+
+# Screenshots are a few hundred KB; anything past this is not a screenshot
+MAX_SCREENSHOT_BYTES = 8_000_000
+
+# Downloads are pure network I/O, so a small thread pool fetches a
+# license's screenshots side by side.
+_IMAGE_DOWNLOAD_EXECUTOR = ThreadPoolExecutor(
+    max_workers=16,
+    thread_name_prefix="screenshot-download",
+)
+
 
 # --------------------------------------------------------------------------- #
 # Helper functions
 # --------------------------------------------------------------------------- #
 
+@lru_cache(maxsize=None)
+def _tz(name: str):
+    """
+    Memoized pytz.timezone lookup; every license resolves its timezone
+    several times per run. Unbounded is fine: there are only ~600 zone
+    names. Unknown names still raise UnknownTimeZoneError.
+    """
+    return pytz.timezone(name)
+
+
 def get_formatted_date_us_central() -> str:
     """
     Get the current date formatted as 'YYYY-MM-DD' in the monitoring timezone.
@@ -70,7 +180,7 @@ def get_formatted_date_us_central() -> str:
     Texas dates even if the script runs on a machine in another timezone.
     """
     try:
-        texas_timezone = pytz.timezone(MONITORING_TZ_NAME)
+        texas_timezone = _tz(MONITORING_TZ_NAME)
         now_in_texas = datetime.now(texas_timezone)
         formatted_date = now_in_texas.strftime("%Y-%m-%d")
         logger.info("Formatted date (%s): %s", MONITORING_TZ_NAME, formatted_date)
@@ -78,7 +188,7 @@ def get_formatted_date_us_central() -> str:
     except Exception as error:
         logger.error("Error formatting date: %s", error, exc_info=True)
         # Fallback to naive today if something goes wrong
-        return datetime.utcnow().strftime("%Y-%m-%d")
+        return datetime.now(pytz.utc).strftime("%Y-%m-%d")
 
 def get_last_checked_timestamp() -> str:
     """
@@ -88,7 +198,7 @@ def get_last_checked_timestamp() -> str:
     (or whatever MONITORING_TZ_NAME is set to), not your local machine time.
     """
     try:
-        tz = pytz.timezone(MONITORING_TZ_NAME)
+        tz = _tz(MONITORING_TZ_NAME)
         now_in_tz = datetime.now(tz)
         return now_in_tz.strftime("%Y-%m-%d %H:%M:%S")
     except Exception as error:
@@ -98,13 +208,20 @@ def get_last_checked_timestamp() -> str:
             exc_info=True,
         )
         # As a fallback, still return something sane instead of crashing
-        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        return datetime.now(pytz.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
-def is_store_open(store_hours_json: str, timezone_name: str) -> bool:
+def is_store_open(
+    store_hours_json: str,
+    timezone_name: str,
+    now: Optional[datetime] = None,
+) -> bool:
     """
     Decide if a store is considered OPEN *right now* based on `storeHours`.
 
+    `now` is an aware datetime for "right now" (e.g. captured once per page
+    of licenses); when omitted the current time is read.
+
     Supports both formats:
       1) New format with openingHourData/closingHourData:
          {
@@ -130,146 +247,428 @@ def is_store_open(store_hours_json: str, timezone_name: str) -> bool:
         # No store hours – safest is to treat as closed.
         return False
 
-    # Parse the JSON
-    try:
-        store_hours = json.loads(store_hours_json)
-    except (TypeError, json.JSONDecodeError) as exc:
-        logger.warning("Invalid storeHours JSON: %s", exc)
+    if not isinstance(store_hours_json, (str, bytes)):
+        logger.warning("Invalid storeHours JSON: %r", type(store_hours_json))
+        return False
+
+    # Parsed once per distinct storeHours string
+    schedule = _parse_store_hours(store_hours_json)
+    if schedule is None:
         return False
 
     # Normalise timezone
+    tz_name = timezone_name or "US/Central"
     try:
-        tz = pytz.timezone(timezone_name or "US/Central")
+        _tz(tz_name)
     except Exception:
         logger.warning("Unknown timezone '%s', defaulting to US/Central", timezone_name)
-        tz = pytz.timezone("US/Central")
-
-    now = datetime.now(tz)
-    current_time = now.time()
-    current_day_name = now.strftime("%A")  # e.g. "Monday"
-
-    def _parse_period(period: dict) -> Optional[tuple]:
-        """Return (opening_time, closing_time) as datetime.time, or None if unusable."""
-        # New nested format
-        if "openingHourData" in period and "closingHourData" in period:
-            o = period["openingHourData"]
-            c = period["closingHourData"]
-            opening_time = time(
-                hour=o.get("hour", 0),
-                minute=o.get("minute", 0),
-                second=o.get("second", 0),
-            )
-            closing_time = time(
-                hour=c.get("hour", 0),
-                minute=c.get("minute", 0),
-                second=c.get("second", 0),
-            )
-            return opening_time, closing_time
+        tz_name = "US/Central"
 
-        # Old string format: "open": "10:00 AM", "close": "6:00 PM"
-        open_str = period.get("open")
-        close_str = period.get("close")
-        if not open_str or not close_str:
+    # Seconds since local midnight (periods are cached in the same unit)
+    # and the local day name, shared by every license in this timezone
+    _, current_time, current_day_name = _local_clock(
+        tz_name,
+        now if now is not None else datetime.now(pytz.utc),
+    )
+
+    periods_by_day, every_day_periods = schedule
+    # Today's named entries plus any entry without a day name
+    for periods in (periods_by_day.get(current_day_name, ()), every_day_periods):
+        for opening_time, closing_time in periods:
+            if opening_time <= closing_time:
+                # Same-day closing
+                if opening_time <= current_time <= closing_time:
+                    return True
+            else:
+                # Overnight window (e.g. 20:00–02:00)
+                if current_time >= opening_time or current_time <= closing_time:
+                    return True
+
+    # No matching open period found
+    return False
+
+
+def _parse_store_hours_period(period: dict) -> Optional[Tuple[time, time]]:
+    """Return (opening_time, closing_time) as datetime.time, or None if unusable."""
+    # New nested format
+    if "openingHourData" in period and "closingHourData" in period:
+        o = period["openingHourData"]
+        c = period["closingHourData"]
+        opening_time = time(
+            hour=o.get("hour", 0),
+            minute=o.get("minute", 0),
+            second=o.get("second", 0),
+        )
+        closing_time = time(
+            hour=c.get("hour", 0),
+            minute=c.get("minute", 0),
+            second=c.get("second", 0),
+        )
+        return opening_time, closing_time
+
+    # Old string format: "open": "10:00 AM", "close": "6:00 PM"
+    open_str = period.get("open")
+    close_str = period.get("close")
+    if not open_str or not close_str:
+        return None
+
+    opening_time = _parse_clock_time(open_str)
+    closing_time = _parse_clock_time(close_str)
+    if opening_time is not None and closing_time is not None:
+        return opening_time, closing_time
+
+    logger.warning("Could not parse store hours period: %s", period)
+    return None
+
+
+def _parse_clock_time(value: str) -> Optional[time]:
+    """
+    Parse "10:00 AM" / "6:00 PM" (12-hour) or "18:00" (24-hour) into a time.
+
+    Accepts what the old strptime formats "%I:%M %p" and "%H:%M" did,
+    without strptime's per-call format handling. Returns None if invalid.
+    """
+    match = _CLOCK_TIME_RE.fullmatch(value.strip()) if isinstance(value, str) else None
+    if not match:
+        return None
+
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2)), match.group(3)
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
             return None
+        hour = hour % 12 + (12 if meridiem.upper() == "PM" else 0)
+    elif hour > 23:
+        return None
+    return time(hour, minute)
 
-        for fmt in ("%I:%M %p", "%H:%M"):
-            try:
-                o_dt = datetime.strptime(open_str, fmt)
-                c_dt = datetime.strptime(close_str, fmt)
-                return o_dt.time(), c_dt.time()
-            except ValueError:
-                continue
 
-        logger.warning("Could not parse store hours period: %s", period)
+@lru_cache(maxsize=4096)
+def _parse_store_hours(
+    store_hours_json: Union[str, bytes],
+) -> Optional[Tuple[Dict[str, Tuple[Tuple[int, int], ...]], Tuple[Tuple[int, int], ...]]]:
+    """
+    Parse a raw storeHours string into (periods_by_day, every_day_periods).
+
+    `periods_by_day` maps a day name ("Monday") to its periods, so finding
+    today's entry is a dict lookup; entries without a day name apply to
+    every day and are collected in `every_day_periods`.
+
+    Each period is (opening, closing) in seconds since midnight, so the
+    per-call check is plain integer comparisons. Disabled days and unusable
+    periods are dropped. Many licenses share the
+    same storeHours template, so results are cached by the raw string.
+    Returns None if the JSON is invalid.
+    """
+    try:
+        store_hours = json.loads(store_hours_json)
+    except (TypeError, json.JSONDecodeError) as exc:
+        logger.warning("Invalid storeHours JSON: %s", exc)
         return None
 
+    periods_by_day: Dict[str, List[Tuple[int, int]]] = {}
+    every_day_periods: List[Tuple[int, int]] = []
     # store_hours is usually a list of day objects
     for day in store_hours:
         # Skip disabled days
         if not day.get("status", True):
             continue
 
-        # Match by day name when present
+        periods = []
+        for period in day.get("periods") or []:
+            parsed = _parse_store_hours_period(period)
+            if parsed:
+                opening_time, closing_time = parsed
+                periods.append((
+                    opening_time.hour * 3600 + opening_time.minute * 60 + opening_time.second,
+                    closing_time.hour * 3600 + closing_time.minute * 60 + closing_time.second,
+                ))
+
         day_name = day.get("day")
-        if day_name and day_name != current_day_name:
-            continue
+        if day_name:
+            periods_by_day.setdefault(day_name, []).extend(periods)
+        else:
+            every_day_periods.extend(periods)
 
-        periods = day.get("periods") or []
-        for period in periods:
-            parsed = _parse_period(period)
-            if not parsed:
-                continue
+    return (
+        {name: tuple(periods) for name, periods in periods_by_day.items()},
+        tuple(every_day_periods),
+    )
 
-            opening_time, closing_time = parsed
 
-            if opening_time <= closing_time:
-                # Same-day closing
-                if opening_time <= current_time <= closing_time:
-                    return True
-            else:
-                # Overnight window (e.g. 20:00–02:00)
-                if current_time >= opening_time or current_time <= closing_time:
-                    return True
+class _ImageStats(NamedTuple):
+    """Luminance statistics of a screenshot's sampled center region."""
+
+    black_ratio: float
+    mean: float
+    stddev: float
+
+
+def _image_stats(image: Image.Image) -> Optional[_ImageStats]:
+    """
+    Compute luminance stats for `image` from a single histogram.
+
+    Only the center of the frame (the player's video area) is examined, so
+    border UI chrome does not skew the numbers. On full-size frames only
+    every 4th pixel in each direction is sampled (1/64 of the pixels in
+    total); small previews are examined in full. Accepts an already-
+    grayscale ("L") image without converting it again.
+
+    Returns None if the histogram is empty.
+    """
+    width, height = image.size
+    box = (width // 4, height // 4, 3 * width // 4, 3 * height // 4)
+    step = 4 if width >= 640 else 1
+    sample_size = (
+        max(1, (box[2] - box[0]) // step),
+        max(1, (box[3] - box[1]) // step),
+    )
+    # Crop + stride in one pass; NEAREST keeps pixel values untouched
+    sample = image.resize(sample_size, Image.NEAREST, box=box)
+    grayscale_image = sample if sample.mode == "L" else sample.convert("L")
+    histogram = grayscale_image.histogram()
+
+    if not histogram:
+        return None
+
+    # The sample's size is the pixel count; no need to sum 256 bins
+    total_pixels = sample_size[0] * sample_size[1]
+    # Mean / stddev come from the same histogram, no second pass
+    stat = ImageStat.Stat(histogram)
+    return _ImageStats(
+        black_ratio=histogram[0] / total_pixels if total_pixels else 0.0,
+        mean=stat.mean[0],
+        stddev=stat.stddev[0],
+    )
 
-    # No matching open period found
-    return False
 
 def is_black_screen(image: Image.Image) -> bool:
     """
     Determine if an image is predominantly black (> 90% black pixels),
     adapted from your old is_black_screen.
+
+    See _image_stats for which pixels are examined.
     """
     try:
-        grayscale_image = image.convert("L")
-        histogram = grayscale_image.histogram()
-
-        if not histogram:
+        stats = _image_stats(image)
+        if stats is None:
             logger.warning("Empty histogram. Unable to analyze image.")
             return False
 
-        total_pixels = sum(histogram)
-        black_pixels = histogram[0]
-        black_ratio = black_pixels / total_pixels if total_pixels else 0.0
-
-        is_black = black_ratio > 0.9
+        is_black = stats.black_ratio > 0.9
         if is_black:
-            logger.warning("Detected a black screen (black ratio %.2f).", black_ratio)
+            logger.warning("Detected a black screen (black ratio %.2f).", stats.black_ratio)
         return is_black
     except Exception as e:
         logger.error("Error analyzing black screen: %s", e)
         return False
 
 
-def filter_screenshots_for_today(
+def is_black_screen_fast(data: bytes) -> bool:
+    """
+    Black-screen test on raw screenshot bytes without a full decode.
+
+    For JPEGs, Image.draft() lets libjpeg decode only the luminance channel
+    at 1/8 scale (the DCT shortcut), which is all the black test needs.
+    Other formats are decoded normally.
+    """
+    try:
+        # Close the decoder as soon as the preview has been checked
+        with Image.open(BytesIO(data)) as img:
+            width, height = img.size
+            img.draft("L", (max(1, width // 8), max(1, height // 8)))
+            return is_black_screen(img)
+    except Exception as e:
+        logger.error("Error analyzing black screen: %s", e)
+        return False
+
+
+def decode_grayscale_for_ocr(data: bytes) -> Image.Image:
+    """
+    Decode screenshot bytes into a grayscale image for OCR.
+
+    For JPEGs, draft() decodes only the luminance channel and lets libjpeg
+    scale down in the DCT domain when the frame is at least twice the OCR
+    height, so prepare_image_for_ocr has less left to do.
+    """
+    with Image.open(BytesIO(data)) as img:
+        width, height = img.size
+        target_height = min(height, OCR_MAX_HEIGHT)
+        img.draft("L", (max(1, width * target_height // height), target_height))
+        return img.convert("L")
+
+
+def prepare_image_for_ocr(gray: Image.Image) -> Image.Image:
+    """
+    Downscale a grayscale screenshot to at most OCR_MAX_HEIGHT pixels tall,
+    keeping the aspect ratio. Smaller images are returned unchanged.
+    """
+    width, height = gray.size
+    if height <= OCR_MAX_HEIGHT:
+        return gray
+    new_width = max(1, width * OCR_MAX_HEIGHT // height)
+    return gray.resize((new_width, OCR_MAX_HEIGHT), Image.BILINEAR)
+
+
+def _tesserocr_api():
+    """Return this thread's tesserocr engine, creating it on first use."""
+    api = getattr(_OCR_LOCAL, "api", None)
+    if api is None:
+        kwargs = {"lang": "eng", "oem": OEM.LSTM_ONLY, "psm": PSM.SINGLE_BLOCK}
+        if os.getenv("TESSDATA_PREFIX"):
+            kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+        api = PyTessBaseAPI(**kwargs)
+        api.SetVariable("tessedit_char_whitelist", OCR_CHAR_WHITELIST)
+        _OCR_LOCAL.api = api
+    return api
+
+
+def ocr_image_text(image: Image.Image) -> str:
+    """
+    OCR an image and return the raw text.
+
+    Uses an in-process tesserocr engine when tesserocr is installed, which
+    avoids spawning a tesseract process and reloading the model per image;
+    otherwise shells out through pytesseract with TESSERACT_CONFIG.
+
+    Blocks while OCR_CONCURRENCY other OCR calls are running.
+    """
+    with _OCR_SLOTS:
+        return _ocr_image_text_unlocked(image)
+
+
+def _ocr_image_text_unlocked(image: Image.Image) -> str:
+    """ocr_image_text without taking an OCR slot; the caller holds one."""
+    if PyTessBaseAPI is not None:
+        api = _tesserocr_api()
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    return _tesseract_via_stdin(image)
+
+
+def ocr_images_text(images: List[Image.Image], license_key: str = "") -> List[Optional[str]]:
+    """
+    OCR several images and return their texts, in order.
+
+    Each image is OCR'd on its own, so a failure (a corrupt frame, a
+    tesseract error) only costs that image: it is logged and its text is
+    None. TesseractNotFoundError is raised, since no image can succeed
+    then. Holds one OCR slot for the whole list.
+    """
+    texts: List[Optional[str]] = []
+    with _OCR_SLOTS:
+        for image in images:
+            try:
+                texts.append(_ocr_image_text_unlocked(image))
+            except pytesseract.TesseractNotFoundError:
+                raise
+            except Exception as e:
+                logger.error("OCR error on a screenshot of license %s: %s", license_key, e)
+                texts.append(None)
+    return texts
+
+
+def _run_tesseract(source: str, stdin: Optional[bytes] = None) -> str:
+    """
+    Run the tesseract binary on `source` ("stdin" or an image path) with
+    TESSERACT_CONFIG and return what it prints on stdout.
+
+    Raises pytesseract.TesseractNotFoundError / TesseractError like
+    pytesseract does, so callers' error handling is unchanged.
+    """
+    cmd = [
+        pytesseract.pytesseract.tesseract_cmd,
+        source,
+        "stdout",
+        *shlex.split(TESSERACT_CONFIG, posix=os.name != "nt"),
+    ]
+    # Don't flash a console window per call on Windows agents
+    creationflags = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+    try:
+        proc = subprocess.run(
+            cmd,
+            input=stdin,
+            capture_output=True,
+            creationflags=creationflags,
+        )
+    except FileNotFoundError:
+        raise pytesseract.TesseractNotFoundError()
+
+    if proc.returncode != 0:
+        raise pytesseract.TesseractError(
+            proc.returncode,
+            proc.stderr.decode("utf-8", "replace").strip(),
+        )
+    return proc.stdout.decode("utf-8", "replace")
+
+
+def _tesseract_via_stdin(image: Image.Image) -> str:
+    """
+    Run the tesseract binary on `image`, piping it through stdin/stdout.
+
+    pytesseract writes every image to a temporary PNG (paying for zlib
+    compression) and reads the result back from a temporary .txt file.
+    Here the image is sent as uncompressed PNM, which leptonica reads
+    natively, and the text comes back on stdout; no temp files are used.
+    """
+    buf = BytesIO()
+    image.save(buf, format="PPM")  # PGM for "L" images
+    return _run_tesseract("stdin", stdin=buf.getvalue())
+
+
+@lru_cache(maxsize=256)
+def _local_clock(timezone_name: str, now: datetime) -> Tuple[str, int, str]:
+    """
+    Convert the shared aware `now` to `timezone_name` once.
+
+    Returns (YYYYMMDD, seconds since local midnight, day name). Keyed by
+    (timezone, now), so with one `now` per page every license in the same
+    timezone reuses a single conversion for both the store-hours and the
+    today's-screenshots checks.
+    """
+    local = now.astimezone(_tz(timezone_name))
+    return (
+        local.strftime("%Y%m%d"),
+        local.hour * 3600 + local.minute * 60 + local.second,
+        local.strftime("%A"),
+    )
+
+
+def _todays_screenshots(
     file_urls: List[str],
     timezone_name: str,
     license_key: str,
-) -> List[str]:
+    now: Optional[datetime] = None,
+) -> List[Tuple[str, str]]:
     """
-    Filter screenshot URLs whose filenames start with today's date (YYYYMMDD)
-    in the store's timezone, based on your old process_screenshot_names.
+    Return (url, filename) pairs for the screenshots whose filenames start
+    with today's date (YYYYMMDD) in the store's timezone, so callers can
+    sort and parse filenames without splitting the URL again.
+
+    `now` is an aware datetime for "today"; when omitted the clock is read.
     """
-    matching_screenshots: List[str] = []
+    matching_screenshots: List[Tuple[str, str]] = []
 
     try:
-        store_timezone = pytz.timezone(timezone_name)
+        if now is None:
+            now = datetime.now(pytz.utc)
+        current_date = _local_clock(timezone_name, now)[0]
     except pytz.UnknownTimeZoneError:
         logger.error("Invalid timezone for license %s: %s", license_key, timezone_name)
         return []
 
-    current_time = datetime.now(store_timezone)
-    current_date = current_time.strftime("%Y%m%d")
-
-    for url in file_urls[:10]:  # limit to first 10
+    for url in islice(file_urls, 10):  # limit to first 10
         if not url:
             continue
 
-        filename = url.split("/")[-1]
-        filename_wo_ext = filename.replace(".jpg", "")
-        screenshot_date = filename_wo_ext[:8]
+        # Filenames start with YYYYMMDD; slice it straight out of the URL
+        start = url.rfind("/") + 1
+        screenshot_date = url[start:start + 8]
 
         if screenshot_date == current_date:
-            matching_screenshots.append(url)
+            matching_screenshots.append((url, url[start:]))
 
     if matching_screenshots:
         logger.info(
@@ -286,30 +685,56 @@ def filter_screenshots_for_today(
     return matching_screenshots
 
 
-def ocr_image_from_url(url: str) -> Optional[str]:
-    """Download an image from URL and run OCR, returning lowercased text."""
-    try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        img = Image.open(BytesIO(resp.content))
-        text = pytesseract.image_to_string(img)
-        return text.strip().lower()
-    except Exception as e:
-        logger.error("Error OCR-ing image from %s: %s", url, e)
-        return None
-
+def download_image_bytes(url: str) -> Optional[bytes]:
+    """
+    Download an image from URL and return the raw (still encoded) bytes.
 
-def load_image_from_url(url: str) -> Optional[Image.Image]:
-    """Download an image from URL and return a PIL.Image.Image."""
+    Responses larger than MAX_SCREENSHOT_BYTES are rejected (None) without
+    buffering them: first by Content-Length, then while streaming the body.
+    """
     try:
-        resp = requests.get(url, timeout=30)
-        resp.raise_for_status()
-        return Image.open(BytesIO(resp.content))
+        with _IMAGE_SESSION.get(url, timeout=IMAGE_DOWNLOAD_TIMEOUT, stream=True) as resp:
+            resp.raise_for_status()
+
+            declared = int(resp.headers.get("Content-Length") or 0)
+            if declared > MAX_SCREENSHOT_BYTES:
+                logger.warning(
+                    "Skipping oversized screenshot %s (%s bytes).", url, declared
+                )
+                return None
+
+            # Chunks are joined once at the end: a single copy of the body,
+            # instead of growing a bytearray and copying it again into bytes
+            chunks: List[bytes] = []
+            size = 0
+            for chunk in resp.iter_content(chunk_size=64 * 1024):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > MAX_SCREENSHOT_BYTES:
+                    logger.warning(
+                        "Skipping oversized screenshot %s (> %s bytes).",
+                        url,
+                        MAX_SCREENSHOT_BYTES,
+                    )
+                    return None
+            return b"".join(chunks)
     except Exception as e:
         logger.error("Error loading image from %s: %s", url, e)
         return None
 
 
+def download_images(urls: List[str]) -> List[Optional[bytes]]:
+    """
+    Download several images concurrently.
+
+    Returns one entry per URL, in the same order; failed downloads are None.
+    Wall time is roughly the slowest download instead of the sum.
+    """
+    if len(urls) <= 1:
+        return [download_image_bytes(url) for url in urls]
+    return list(_IMAGE_DOWNLOAD_EXECUTOR.map(download_image_bytes, urls))
+
+
 def _reorder_monitoring_tabs_for_today(today_tab_name: str) -> None:
     """
     Reorder worksheets in the monitoring spreadsheet to match this layout:
@@ -330,10 +755,7 @@ def _reorder_monitoring_tabs_for_today(today_tab_name: str) -> None:
         return
 
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-        creds = Credentials.from_service_account_file(credentials_file, scopes=scopes)
-        client = gspread.authorize(creds)
-        sh = client.open_by_key(spreadsheet_id)
+        sh = open_spreadsheet(spreadsheet_id, credentials_file)
     except Exception as e:
         logger.error("Failed to initialize gspread for tab reordering: %s", e)
         return
@@ -346,11 +768,18 @@ def _reorder_monitoring_tabs_for_today(today_tab_name: str) -> None:
 
     name_to_ws = {ws.title: ws for ws in worksheets}
     ordered: List[Any] = []
+    # id()s of worksheets already placed, for O(1) membership checks
+    seen = set()
+
+    def add(ws) -> None:
+        if id(ws) not in seen:
+            seen.add(id(ws))
+            ordered.append(ws)
 
     def add_if_present(name: str) -> None:
         ws = name_to_ws.get(name)
-        if ws and ws not in ordered:
-            ordered.append(ws)
+        if ws:
+            add(ws)
 
     # 1) Today first
     add_if_present(today_tab_name)
@@ -366,18 +795,16 @@ def _reorder_monitoring_tabs_for_today(today_tab_name: str) -> None:
     daily_tabs = [
         ws
         for ws in worksheets
-        if re.fullmatch(r"\d{4}-\d{2}-\d{2}", ws.title)
+        if _DATE_TAB_RE.fullmatch(ws.title)
         and ws.title != today_tab_name
     ]
-    daily_tabs_sorted = sorted(daily_tabs, key=lambda ws: ws.title, reverse=True)
+    daily_tabs_sorted = sorted(daily_tabs, key=attrgetter("title"), reverse=True)
     for ws in daily_tabs_sorted:
-        if ws not in ordered:
-            ordered.append(ws)
+        add(ws)
 
     # 5) Any remaining worksheets (e.g., Test, Offline 6-30 Days, etc.)
     for ws in worksheets:
-        if ws not in ordered:
-            ordered.append(ws)
+        add(ws)
 
     try:
         sh.reorder_worksheets(ordered)
@@ -393,22 +820,121 @@ def _reorder_monitoring_tabs_for_today(today_tab_name: str) -> None:
 # Main check
 # --------------------------------------------------------------------------- #
 
+def _analyze_screenshots(
+    urls: List[str],
+    datas: List[Optional[bytes]],
+    license_key: str,
+    screenshot_cache: Optional[Dict[bytes, Tuple[bool, FrozenSet[str]]]] = None,
+    black_screen_limit: Optional[int] = None,
+) -> List[Optional[Tuple[bool, FrozenSet[str]]]]:
+    """
+    Classify a license's downloaded screenshots.
+
+    Returns one entry per URL: (is_black, error phrases found), or None when
+    the download, decode or OCR failed or was skipped (such results are not
+    cached). Black frames are settled on the cheap preview; the remaining
+    frames are OCR'd under one OCR slot, each on its own. If `black_screen_limit` black
+    frames are found, the outcome is already known and OCR is skipped.
+    """
+    results: List[Optional[Tuple[bool, FrozenSet[str]]]] = [None] * len(urls)
+    to_ocr: List[Tuple[int, bytes, Image.Image]] = []
+    black_screens = 0
+
+    for idx, (url, data) in enumerate(zip(urls, datas)):
+        if not data:
+            continue
+
+        # Byte-identical screenshots (a player stuck on the same screen, or
+        # the same overlay on several players) are analyzed once per run.
+        cache_key = hashlib.blake2b(data, digest_size=16).digest()
+        cached = screenshot_cache.get(cache_key) if screenshot_cache is not None else None
+        if cached is not None:
+            results[idx] = cached
+            black_screens += cached[0]
+            continue
+
+        # Black frames are caught on a 1/8-scale preview; only the rest
+        # pay for a full decode before OCR.
+        if is_black_screen_fast(data):
+            black_screens += 1
+            results[idx] = (True, frozenset())
+            if screenshot_cache is not None:
+                screenshot_cache[cache_key] = results[idx]
+            continue
+
+        try:
+            gray = decode_grayscale_for_ocr(data)
+        except Exception as e:
+            logger.error("Error loading image from %s: %s", url, e)
+            continue
+        to_ocr.append((idx, cache_key, prepare_image_for_ocr(gray)))
+
+    if not to_ocr:
+        return results
+
+    if black_screen_limit is not None and black_screens >= black_screen_limit:
+        logger.debug(
+            "Skipping OCR for license %s: %s black screens.",
+            license_key,
+            black_screens,
+        )
+        return results
+
+    try:
+        texts = ocr_images_text([image for _, _, image in to_ocr], license_key)
+    except pytesseract.TesseractNotFoundError as e:
+        logger.error(
+            "Tesseract not found while OCR-ing screenshot for license %s: %s",
+            license_key,
+            e,
+        )
+        return results
+    except Exception as e:
+        logger.error(
+            "Unexpected OCR error for license %s: %s",
+            license_key,
+            e,
+        )
+        return results
+
+    for (idx, cache_key, _), text in zip(to_ocr, texts):
+        if text is None:
+            # OCR failed for this frame only; leave it unanalyzed (and uncached)
+            continue
+        # Each phrase counts at most once per screenshot; matches are
+        # lowercased so they compare equal to the ERROR_MESSAGES entries
+        results[idx] = (
+            False,
+            frozenset(match.lower() for match in _ERROR_MESSAGES_RE.findall(text)),
+        )
+        if screenshot_cache is not None:
+            screenshot_cache[cache_key] = results[idx]
+
+    return results
+
+
 def _process_license(
     api: APIClient,
-    sheets: SheetsClient,
-    ws,
-    row_counter: int,
     license_data: Dict[str, Any],
-) -> int:
+    screenshot_cache: Optional[Dict[bytes, Tuple[bool, FrozenSet[str]]]] = None,
+    run_now: Optional[datetime] = None,
+) -> Optional[List[Any]]:
     """
     Process a single license:
       - Check if store is open.
       - Fetch screenshots.
       - Filter for today's screenshots.
       - Detect black screens and error text.
-      - Upsert a single row into today's sheet (one row per license per day).
+      - Build the row for today's sheet (one row per license per day).
 
-    Returns the updated row_counter (used just for logging / stats).
+    Returns the row values, or None when the store is closed and nothing
+    should be written. Does not touch Sheets, so it is safe to run from
+    worker threads.
+
+    `screenshot_cache` maps a screenshot's content hash to its analysis
+    result; pass the same dict for a whole run to skip repeat OCR.
+    `run_now` is the aware "current time" shared by a batch of licenses
+    for the store-hours and today's-screenshot checks.
     """
     license_id = str(license_data.get("licenseId", ""))
     license_key = str(license_data.get("licenseKey", ""))
@@ -427,8 +953,8 @@ def _process_license(
     store_hours_json = license_data.get("storeHours", "[]")
 
     # If store is closed, skip logging entirely for this run
-    if not is_store_open(store_hours_json, timezone_name):
-        return row_counter
+    if not is_store_open(store_hours_json, timezone_name, now=run_now):
+        return None
 
     # Last checked in monitoring timezone (e.g. US/Central)
     last_checked = get_last_checked_timestamp()
@@ -436,7 +962,6 @@ def _process_license(
     # --- Fetch screenshots for this license ---
     screenshots_data = api.get_screenshots(license_id)
     if not screenshots_data:
-        row_counter += 1
         logger.warning("No screenshots data for license %s.", license_key)
 
         values = [
@@ -451,13 +976,10 @@ def _process_license(
             "",
             last_checked,
         ]
-        # One row per license key in this sheet
-        sheets.upsert_row(ws, key_value=license_key, values=values, key_col=1)
-        return row_counter
+        return values
 
     file_urls = screenshots_data.get("files", [])
     if not file_urls:
-        row_counter += 1
         logger.warning("Empty 'files' list in screenshots for license %s.", license_key)
 
         values = [
@@ -472,14 +994,16 @@ def _process_license(
             "",
             last_checked,
         ]
-        sheets.upsert_row(ws, key_value=license_key, values=values, key_col=1)
-        return row_counter
+        return values
 
     # --- Filter to today's screenshots ---
-    todays_urls = filter_screenshots_for_today(file_urls, timezone_name, license_key)
-    if not todays_urls:
-        row_counter += 1
-
+    todays_screenshots = _todays_screenshots(
+        file_urls,
+        timezone_name,
+        license_key,
+        now=run_now,
+    )
+    if not todays_screenshots:
         values = [
             license_key,
             license_id,
@@ -492,56 +1016,46 @@ def _process_license(
             "",
             last_checked,
         ]
-        sheets.upsert_row(ws, key_value=license_key, values=values, key_col=1)
-        return row_counter
+        return values
 
     # Choose "latest" screenshot by filename (YYYYMMDDHHMMSS.jpg)
-    try:
-        latest_url = max(
-            todays_urls,
-            key=lambda u: u.split("/")[-1],
-        )
-    except ValueError:
-        latest_url = todays_urls[0]
+    latest_url, latest_filename = max(todays_screenshots, key=itemgetter(1))
 
-    latest_ts = _extract_timestamp_from_url(latest_url, timezone_name)
+    latest_ts = _timestamp_from_filename(latest_filename, timezone_name)
 
     black_screens = 0
     detected_errors: List[str] = []
-    error_screenshot_url: Optional[str] = None  # screenshot where we first saw an error
-
-    for url in todays_urls[:4]:  # limit to first few
-        img = load_image_from_url(url)
-        if not img:
+    # (url, filename) of the screenshot where we first saw an error
+    error_screenshot: Optional[Tuple[str, str]] = None
+    # (url, filename) of the first black frame
+    black_screenshot: Optional[Tuple[str, str]] = None
+
+    # Limit to the first few, downloaded side by side
+    sample = todays_screenshots[:SCREENSHOTS_PER_LICENSE]
+    sample_urls = [url for url, _ in sample]
+    analyses = _analyze_screenshots(
+        sample_urls,
+        download_images(sample_urls),
+        license_key,
+        screenshot_cache,
+        black_screen_limit=BLACK_SCREENS_FOR_STATUS,
+    )
+    for screenshot, result in zip(sample, analyses):
+        if result is None:
             continue
 
-        if is_black_screen(img):
+        is_black, found = result
+        if is_black:
             black_screens += 1
+            if black_screenshot is None:
+                black_screenshot = screenshot
             continue
 
-        try:
-            text = pytesseract.image_to_string(img).strip().lower()
-        except pytesseract.TesseractNotFoundError as e:
-            logger.error(
-                "Tesseract not found while OCR-ing screenshot for license %s: %s",
-                license_key,
-                e,
-            )
-            continue
-        except Exception as e:
-            logger.error(
-                "Unexpected OCR error for license %s: %s",
-                license_key,
-                e,
-            )
-            continue
-
-        for err in ERROR_MESSAGES:
-            if err in text:
-                detected_errors.append(err)
-                # Remember the first screenshot where we saw an error string
-                if error_screenshot_url is None:
-                    error_screenshot_url = url
+        if found:
+            detected_errors.extend(found)
+            # Remember the first screenshot where we saw an error string
+            if error_screenshot is None:
+                error_screenshot = screenshot
 
     error_count = len(detected_errors)
     unique_errors = sorted(set(detected_errors))
@@ -550,16 +1064,24 @@ def _process_license(
     # Choose which screenshot URL to display in the sheet.
     # Default: latest screenshot of the day. If we detect any error text,
     # prefer the screenshot where the first error was seen so the image
-    # matches the Detected Error Text.
+    # matches the Detected Error Text. A black-screen status stops OCR of
+    # the remaining frames (so error text may be missing), and shows the
+    # first black frame instead so the image matches the status.
     display_url = latest_url
     display_ts = latest_ts
+    display_screenshot: Optional[Tuple[str, str]] = None
 
-    if error_count >= 1 and error_screenshot_url:
-        display_url = error_screenshot_url
-        display_ts = _extract_timestamp_from_url(display_url, timezone_name)
+    if black_screens >= BLACK_SCREENS_FOR_STATUS and black_screenshot:
+        display_screenshot = black_screenshot
+    elif error_count >= 1 and error_screenshot:
+        display_screenshot = error_screenshot
+
+    if display_screenshot is not None:
+        display_url, display_filename = display_screenshot
+        display_ts = _timestamp_from_filename(display_filename, timezone_name)
 
     # Decide final screenshot status
-    if black_screens >= 3:
+    if black_screens >= BLACK_SCREENS_FOR_STATUS:
         screenshot_status = "OPEN_HOURS_BLACK_SCREEN"
     elif error_count >= 5:
         screenshot_status = "STUCK_ON_ERROR"
@@ -568,8 +1090,6 @@ def _process_license(
     else:
         screenshot_status = "OK"
 
-    row_counter += 1
-
     values = [
         license_key,
         license_id,
@@ -582,7 +1102,6 @@ def _process_license(
         error_text,
         last_checked,
     ]
-    sheets.upsert_row(ws, key_value=license_key, values=values, key_col=1)
 
     if screenshot_status != "OK":
         logger.warning(
@@ -593,7 +1112,68 @@ def _process_license(
             error_count,
         )
 
-    return row_counter
+    return values
+
+
+def _fetch_license_page(
+    api: APIClient,
+    page: int,
+    page_size: int,
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    Fetch one page of active, assigned licenses for the screenshot check.
+
+    Returns the page's licenses, or None when there is nothing (more) to
+    process or the response is unusable.
+    """
+    params = {
+        "page": page,
+        "pageSize": page_size,
+        "search": "",
+        "sortColumn": "PiStatus",
+        "sortOrder": "desc",
+        "includeAdmin": "false",
+        # NOTE: We do NOT filter by piStatus here; screenshot health
+        # should consider all active, assigned licenses, regardless of
+        # whether the player is currently online.
+        "active": "true",
+        "assigned": "true",
+    }
+
+    logger.info("Screenshot health: requesting licenses with params=%s", params)
+    data = api.get_licenses(params=params)
+
+    if not data:
+        logger.warning("No data returned for screenshot health on page %s.", page)
+        return None
+
+    if not isinstance(data, dict):
+        logger.warning(
+            "Unexpected data type for screenshot health response on page %s: %s",
+            page,
+            type(data),
+        )
+        return None
+
+    logger.info(
+        "Screenshot health: response keys=%s, message=%r",
+        list(data.keys()),
+        data.get("message"),
+    )
+
+    # Try to get licenses from the top level first
+    licenses = data.get("licenses")
+
+    # Some NC endpoints wrap payload like {"message": {...}}
+    message_payload = data.get("message")
+    if licenses is None and isinstance(message_payload, dict):
+        licenses = message_payload.get("licenses")
+
+    if not licenses:
+        logger.info("No more licenses for screenshot health (page %s).", page)
+        return None
+
+    return licenses
 
 
 def run_screenshot_health() -> None:
@@ -607,7 +1187,7 @@ def run_screenshot_health() -> None:
     """
     logger.info("Starting screenshot health check...")
 
-    api = APIClient()
+    api = get_api_client()
     sheets = SheetsClient()
 
     sheet_name = get_formatted_date_us_central()
@@ -626,105 +1206,107 @@ def run_screenshot_health() -> None:
         f"Last Checked ({MONITORING_TZ_NAME})",
     ]
 
-    sheets.ensure_headers(ws, headers)
+    # Header fix-up and formatting go out as one batchUpdate
+    with sheets.format_batch():
+        sheets.ensure_headers(ws, headers)
 
-    # Make the sheet more readable: wider columns + left alignment.
-    try:
-        # A–J => 1–10, adjust pixel_size if you want wider/narrower.
-        sheets.set_column_widths(ws, start_col=1, end_col=len(headers), pixel_size=200)
-    except Exception as exc:
-        logger.warning(
-            "Failed to set column widths for sheet '%s': %s",
-            sheet_name,
-            exc,
-        )
+        # Make the sheet more readable: wider columns + left alignment.
+        try:
+            # A–J => 1–10, adjust pixel_size if you want wider/narrower.
+            sheets.set_column_widths(ws, start_col=1, end_col=len(headers), pixel_size=200)
+        except Exception as exc:
+            logger.warning(
+                "Failed to set column widths for sheet '%s': %s",
+                sheet_name,
+                exc,
+            )
+
+        try:
+            # Left-align everything in columns A–J
+            sheets.set_horizontal_alignment(ws, start_col=1, end_col=len(headers), horizontal="LEFT")
+        except Exception as exc:
+            logger.warning(
+                "Failed to set alignment for sheet '%s': %s",
+                sheet_name,
+                exc,
+            )
 
-    try:
-        # Left-align everything in columns A–J
-        sheets.set_horizontal_alignment(ws, start_col=1, end_col=len(headers), horizontal="LEFT")
-    except Exception as exc:
-        logger.warning(
-            "Failed to set alignment for sheet '%s': %s",
-            sheet_name,
-            exc,
-        )
-        
     # Reorder tabs so today's date sheet + fixed tabs are on the left
     _reorder_monitoring_tabs_for_today(sheet_name)
     
-    # Start row_counter after existing rows
-    existing_values = ws.get_all_values()
-    row_counter = max(len(existing_values), 1)
-
+    # Read the License Key column once; upsert_rows keeps it current as
+    # each page appends, so later pages skip the re-read.
+    row_index = sheets.read_key_index(ws, key_col=1)
+    rows_written = 0
     page = 1
     page_size = 100
 
-    while True:
-        params = {
-            "page": page,
-            "pageSize": page_size,
-            "search": "",
-            "sortColumn": "PiStatus",
-            "sortOrder": "desc",
-            "includeAdmin": "false",
-            # NOTE: We do NOT filter by piStatus here; screenshot health
-            # should consider all active, assigned licenses, regardless of
-            # whether the player is currently online.
-            "active": "true",
-            "assigned": "true",
-        }
-
-        logger.info("Screenshot health: requesting licenses with params=%s", params)
-        data = api.get_licenses(params=params)
-
-        if not data:
-            logger.warning("No data returned for screenshot health on page %s.", page)
-            break
-
-        if not isinstance(data, dict):
-            logger.warning(
-                "Unexpected data type for screenshot health response on page %s: %s",
-                page,
-                type(data),
-            )
-            break
-
-        logger.info(
-            "Screenshot health: response keys=%s, message=%r",
-            list(data.keys()),
-            data.get("message"),
-        )
-
-        # Try to get licenses from the top level first
-        licenses = data.get("licenses")
-
-        # Some NC endpoints wrap payload like {"message": {...}}
-        message_payload = data.get("message")
-        if licenses is None and isinstance(message_payload, dict):
-            licenses = message_payload.get("licenses")
-
-        if not licenses:
-            logger.info("No more licenses for screenshot health (page %s).", page)
-            break
-
-        logger.info("Processing %s licenses on page %s.", len(licenses), page)
-
-        for lic in licenses:
+    # Content hash -> (is_black, error phrases) for this run's screenshots
+    screenshot_cache: Dict[bytes, Tuple[bool, FrozenSet[str]]] = {}
+
+    # The next page is requested while the current one is analyzed, so the
+    # API round-trip is off the critical path.
+    with ThreadPoolExecutor(
+        max_workers=1,
+        thread_name_prefix="screenshot-health-prefetch",
+    ) as prefetch, ThreadPoolExecutor(
+        max_workers=SCREENSHOT_HEALTH_WORKERS,
+        thread_name_prefix="screenshot-health",
+    ) as pool:
+        next_page = prefetch.submit(_fetch_license_page, api, page, page_size)
+
+        while True:
+            licenses = next_page.result()
+            if not licenses:
+                break
+
+            next_page = prefetch.submit(_fetch_license_page, api, page + 1, page_size)
+
+            logger.info("Processing %s licenses on page %s.", len(licenses), page)
+
+            # One clock read per page for the store-hours / date checks
+            run_now = datetime.now(pytz.utc)
+
+            # Analyze the page's licenses in parallel; rows are collected here
+            # and written once per page, so the Sheets client is never shared.
+            pending: List[List[Any]] = []
+            futures = {
+                pool.submit(_process_license, api, lic, screenshot_cache, run_now): lic
+                for lic in licenses
+            }
+            for future in as_completed(futures):
+                lic = futures[future]
+                try:
+                    values = future.result()
+                except Exception as e:
+                    logger.error(
+                        "Error while processing license %s: %s",
+                        lic.get("licenseKey"),
+                        e,
+                        exc_info=True,
+                    )
+                    continue
+                if values is not None:
+                    pending.append(values)
+
+            # One row per license key in this sheet; one batched write per page
             try:
-                row_counter = _process_license(api, sheets, ws, row_counter, lic)
+                sheets.upsert_rows(ws, pending, key_col=1, row_index=row_index)
+                rows_written += len(pending)
             except Exception as e:
                 logger.error(
-                    "Error while processing license %s: %s",
-                    lic.get("licenseKey"),
+                    "Failed to write %s screenshot health rows for page %s: %s",
+                    len(pending),
+                    page,
                     e,
                     exc_info=True,
                 )
 
-        page += 1
+            page += 1
 
-    logger.info("Screenshot health check complete.")
+    logger.info("Screenshot health check complete (%s rows written).", rows_written)
 
-def _extract_timestamp_from_url(url: str, timezone_name: str) -> str:
+def _timestamp_from_filename(filename: str, timezone_name: str) -> str:
     """
     Extract a human-readable timestamp from a screenshot filename of the form
     YYYYMMDDHHMMSS.jpg (or at least YYYYMMDD).
@@ -732,10 +1314,9 @@ def _extract_timestamp_from_url(url: str, timezone_name: str) -> str:
     Returns an empty string on failure.
     """
     try:
-        filename = url.split("/")[-1]
         name_no_ext = filename.split(".")[0]
         # Expect at least YYYYMMDD
-        raw = "".join(ch for ch in name_no_ext if ch.isdigit())
+        raw = _NON_DIGITS_RE.sub("", name_no_ext)
         if len(raw) < 8:
             return ""
 
@@ -745,7 +1326,7 @@ def _extract_timestamp_from_url(url: str, timezone_name: str) -> str:
             dt = datetime.strptime(raw[:8], "%Y%m%d")
 
         try:
-            tz = pytz.timezone(timezone_name or "UTC")
+            tz = _tz(timezone_name or "UTC")
             if dt.tzinfo is None:
                 dt = tz.localize(dt)
         except Exception:
@@ -1,8 +1,13 @@
+import hashlib
+import json
 import logging
 import os
-from typing import Any, Dict, List, Set
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Tuple
 
-from clients.api_client import APIClient
+from clients.api_client import APIClient, get_api_client
 from clients.sheets_client import SheetsClient
 from clients.socket_client import SocketClient
 
@@ -21,18 +26,33 @@ PORTAL_LICENSE_URL = os.getenv(
     "https://portal.n-compass.online/administrator/licenses/{license_id}/{license_key}",
 )
 
+# Both expected versions as one tuple, so each license is checked with a
+# single comparison
+_EXPECTED_VERSIONS = (EXPECTED_SERVER_VERSION, EXPECTED_UI_VERSION)
 
-def _fetch_zone_licenses(api: APIClient, zone: str) -> List[Dict[str, Any]]:
+# Seconds an unchanged zone sheet may go without being rewritten. Restores
+# sheets edited by hand even when the mismatches themselves don't change.
+ZONE_SHEET_REFRESH_SECONDS = float(os.getenv("ZONE_SHEET_REFRESH_SECONDS", "3600"))
+
+# (digest, monotonic write time) of the mismatch rows last written to each
+# zone sheet. When a run produces the same rows within
+# ZONE_SHEET_REFRESH_SECONDS the sheet is assumed up to date and not touched.
+_LAST_SYNCED_DIGEST: Dict[str, Tuple[str, float]] = {}
+
+
+def _iter_zone_licenses(api: APIClient, zone: str) -> Iterator[Dict[str, Any]]:
     """
-    Fetch all online licenses for a given timezone/zone label using
+    Yield all online licenses for a given timezone/zone label using
     /api/license/getall with pagination.
 
+    Licenses are yielded page by page as they arrive, so callers can start
+    checking the first page while later pages are still to be fetched.
+
     Notes:
       - We use pageSize=100 (backend confirmed it's okay).
       - We pass `timezone=zone` to match the real API param.
       - We keep filters for active + assigned + online players.
     """
-    licenses: List[Dict[str, Any]] = []
     page = 1
     page_size = 100  # backend confirmed this is OK
 
@@ -73,89 +93,122 @@ def _fetch_zone_licenses(api: APIClient, zone: str) -> List[Dict[str, Any]]:
             zone,
             page,
         )
-        licenses.extend(page_licenses)
+        yield from page_licenses
         page += 1
 
-    return licenses
+
+@lru_cache(maxsize=1)
+def _zone_sheets_client() -> SheetsClient:
+    """
+    SheetsClient shared by every run in this process, so its cached zone
+    worksheet handles are reused instead of looked up on each run.
+    """
+    return SheetsClient()
 
 
+@lru_cache(maxsize=1)
+def _zone_socket_client() -> SocketClient:
+    """
+    SocketClient shared by every run in this process, so its connection
+    stays open between runs instead of being set up for each one.
+    """
+    return SocketClient()
+
+
+@lru_cache(maxsize=4096)
 def _build_portal_url(license_id: str, license_key: str) -> str:
-    """Build a clickable portal URL for a license."""
+    """
+    Build a clickable portal URL for a license.
+
+    Memoized: the same licenses come back on every run.
+    """
     return PORTAL_LICENSE_URL.format(
         license_id=license_id,
         license_key=license_key,
     )
 
 
-def _check_license_versions(
-    license_data: Dict[str, Any],
-    socket_client: SocketClient,
-) -> Dict[str, Any]:
+def _check_license_versions(license_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     Evaluate a single license's versions.
 
+    Mismatches get a placeholder status here; _send_restart_signals fills
+    in the final one once the restart signals for the zone have been sent.
+
     Returns a dict with:
         {
             "license_id": str,
-            "versions": str,
-            "url": str,
+            "versions": str,   # None for OK licenses
+            "url": str,        # None for OK licenses
             "status": str,
             "is_mismatch": bool,
         }
+
+    Only mismatches end up in the sheet, so the versions text and portal
+    URL are built for those alone; nearly all licenses are OK.
     """
     license_id = str(license_data.get("licenseId", ""))
-    license_key = str(license_data.get("licenseKey", ""))
 
     server_version = str(license_data.get("serverVersion", "") or "")
     ui_version = str(license_data.get("uiVersion", "") or "")
 
-    versions_str = f"Server: {server_version}, UI: {ui_version}"
-    url = _build_portal_url(license_id, license_key)
-
-    logger.debug(
-        "Checking versions for license %s (server=%s, ui=%s)",
-        license_id,
-        server_version,
-        ui_version,
-    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Checking versions for license %s (server=%s, ui=%s)",
+            license_id,
+            server_version,
+            ui_version,
+        )
 
     # If both match expected, nothing to escalate
-    if (
-        server_version == EXPECTED_SERVER_VERSION
-        and ui_version == EXPECTED_UI_VERSION
-    ):
+    if (server_version, ui_version) == _EXPECTED_VERSIONS:
         return {
             "license_id": license_id,
-            "versions": versions_str,
-            "url": url,
+            "versions": None,
+            "url": None,
             "status": "OK",
             "is_mismatch": False,
         }
 
-    # Mismatch – attempt a player restart via socket
-    restart_sent = socket_client.restart_player(license_id)
-    if restart_sent:
-        status = "Version mismatch - player restart signal sent"
-    else:
-        status = "Version mismatch - FAILED to send restart signal"
-
-    logger.warning(
-        "Version mismatch for license %s. %s (expected server=%s ui=%s)",
-        license_id,
-        status,
-        EXPECTED_SERVER_VERSION,
-        EXPECTED_UI_VERSION,
-    )
-
+    license_key = str(license_data.get("licenseKey", ""))
     return {
         "license_id": license_id,
-        "versions": versions_str,
-        "url": url,
-        "status": status,
+        "versions": f"Server: {server_version}, UI: {ui_version}",
+        "url": _build_portal_url(license_id, license_key),
+        "status": "Version mismatch",
         "is_mismatch": True,
     }
 
 
+def _send_restart_signals(
+    socket_client: SocketClient,
+    results: List[Dict[str, Any]],
+) -> None:
+    """
+    Send a player restart for every mismatched license over one socket
+    connection and record the outcome in each result's status.
+    """
+    mismatches = [item for item in results if item["is_mismatch"]]
+    if not mismatches:
+        return
+
+    sent = socket_client.restart_players([item["license_id"] for item in mismatches])
+
+    for item in mismatches:
+        if sent.get(item["license_id"]):
+            item["status"] = "Version mismatch - player restart signal sent"
+        else:
+            item["status"] = "Version mismatch - FAILED to send restart signal"
+
+        logger.warning(
+            "Version mismatch for license %s. %s (expected server=%s ui=%s)",
+            item["license_id"],
+            item["status"],
+            EXPECTED_SERVER_VERSION,
+            EXPECTED_UI_VERSION,
+        )
+
+
 def _sync_zone_sheet(
     sheets: SheetsClient,
     zone: str,
@@ -164,51 +217,75 @@ def _sync_zone_sheet(
     """
     Update the zone worksheet to reflect current mismatches only.
 
-    - Ensures headers: ['License IDs', 'Versions', 'URL', 'Status']
-    - Upserts rows for mismatched licenses.
-    - Removes rows for licenses that no longer mismatch.
-    """
-    ws = sheets.get_or_create_worksheet(zone, rows=1000, cols=4)
-    headers = ["License IDs", "Versions", "URL", "Status"]
-    sheets.ensure_headers(ws, headers)
-
-    # Build set of mismatched license IDs for this run
-    mismatched_ids: Set[str] = {
-        str(item["license_id"]) for item in mismatch_results if item["is_mismatch"]
-    }
-
-    # Upsert mismatched rows
-    for item in mismatch_results:
-        if not item["is_mismatch"]:
-            continue
+    The sheet is a small table of current mismatches, so it is rewritten as
+    a whole: headers ['License IDs', 'Versions', 'URL', 'Status'] plus one
+    row per mismatched license; rows of resolved licenses disappear.
 
-        values = [
+    Skipped entirely (no Sheets calls) when the rows are the same as the
+    last ones this process wrote to the zone sheet.
+    """
+    rows = [
+        [
             item["license_id"],
             item["versions"],
             item["url"],
             item["status"],
         ]
-        sheets.upsert_row(ws, key_value=item["license_id"], values=values, key_col=1)
-
-    # Remove stale rows (licenses that no longer mismatch)
-    existing_values = ws.get_all_values()
-    # existing_values[0] is header row
-    rows_to_delete: List[int] = []
-    for idx, row in enumerate(existing_values[1:], start=2):
-        if not row:
-            continue
-        existing_license_id = row[0].strip()
-        if existing_license_id and existing_license_id not in mismatched_ids:
-            rows_to_delete.append(idx)
-
-    # Delete from bottom to top to avoid index shifting
-    for row_index in sorted(rows_to_delete, reverse=True):
-        logger.info(
-            "Removing resolved license from sheet '%s': row %s",
-            zone,
-            row_index,
-        )
-        ws.delete_row(row_index)
+        for item in mismatch_results
+        if item["is_mismatch"]
+    ]
+    digest = hashlib.blake2b(
+        json.dumps(sorted(rows), default=str).encode("utf-8"),
+        digest_size=16,
+    ).hexdigest()
+    last = _LAST_SYNCED_DIGEST.get(zone)
+    if (
+        last is not None
+        and last[0] == digest
+        and time.monotonic() - last[1] < ZONE_SHEET_REFRESH_SECONDS
+    ):
+        logger.info("Mismatches for zone '%s' unchanged; sheet already up to date.", zone)
+        return
+
+    headers = ["License IDs", "Versions", "URL", "Status"]
+
+    logger.info("Writing %s mismatched licenses to sheet '%s'.", len(rows), zone)
+    sheets.with_worksheet(
+        zone,
+        lambda ws: sheets.replace_all(ws, headers, rows),
+        rows=1000,
+        cols=4,
+    )
+
+    # Only remembered once the write above has succeeded
+    _LAST_SYNCED_DIGEST[zone] = (digest, time.monotonic())
+
+
+def _process_zone(
+    api: APIClient,
+    sheets: SheetsClient,
+    socket_client: SocketClient,
+    zone: str,
+) -> None:
+    """Fetch, check and sync a single zone. Errors are logged, not raised."""
+    try:
+        logger.info("=== Zone: %s ===", zone)
+        results: List[Dict[str, Any]] = []
+        for lic in _iter_zone_licenses(api, zone):
+            result = _check_license_versions(lic)
+            results.append(result)
+
+        if not results:
+            logger.info("No licenses found for zone '%s'. Skipping.", zone)
+            # Also clear sheet if there are no licenses at all
+            _sync_zone_sheet(sheets, zone, mismatch_results=[])
+            return
+
+        _send_restart_signals(socket_client, results)
+        _sync_zone_sheet(sheets, zone, mismatch_results=results)
+
+    except Exception as exc:
+        logger.error("Error processing zone '%s': %s", zone, exc)
 
 
 def run_version_zone_check() -> None:
@@ -220,32 +297,21 @@ def run_version_zone_check() -> None:
       2. Compare server/ui versions to expected.
       3. Send restart signal for mismatches via socket.
       4. Sync a zone-named worksheet with current mismatches.
+
+    Zones are independent and the work is almost all HTTP round-trips,
+    so they run side by side in a small thread pool.
     """
     logger.info("Starting version-by-zone check...")
 
-    api = APIClient()
-    sheets = SheetsClient()
-    socket_client = SocketClient()
-
-    for zone in ZONES:
-        try:
-            logger.info("=== Zone: %s ===", zone)
-            licenses = _fetch_zone_licenses(api, zone)
-
-            if not licenses:
-                logger.info("No licenses found for zone '%s'. Skipping.", zone)
-                # Also clear sheet if there are no licenses at all
-                _sync_zone_sheet(sheets, zone, mismatch_results=[])
-                continue
-
-            results: List[Dict[str, Any]] = []
-            for lic in licenses:
-                result = _check_license_versions(lic, socket_client)
-                results.append(result)
-
-            _sync_zone_sheet(sheets, zone, mismatch_results=results)
+    api = get_api_client()
+    sheets = _zone_sheets_client()
+    socket_client = _zone_socket_client()
 
-        except Exception as exc:
-            logger.error("Error processing zone '%s': %s", zone, exc)
+    with ThreadPoolExecutor(
+        max_workers=len(ZONES),
+        thread_name_prefix="version-zone",
+    ) as executor:
+        for zone in ZONES:
+            executor.submit(_process_zone, api, sheets, socket_client, zone)
 
     logger.info("Version-by-zone check complete.")
@@ -1,15 +1,34 @@
+import asyncio
 import logging
 import os
+import re
 import subprocess
+import threading
 import time
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Optional, Tuple
 
 import pyautogui
 import pygetwindow as gw
 import pytesseract
 from PIL import Image
 
-import os
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # pragma: no cover - opencv is optional
+    cv2 = None
+
+# OCR runs on a thread pool, so keep each tesseract engine single-threaded
+# instead of letting OpenMP oversubscribe the CPU. Set before tesserocr is
+# imported: libtesseract reads it when it loads.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+try:
+    from tesserocr import OEM, PSM, PyTessBaseAPI
+except ImportError:  # pragma: no cover - tesserocr is optional
+    PyTessBaseAPI = None
 
 # Configure pytesseract to use TESSERACT_CMD env var if provided.
 TESSERACT_CMD = os.getenv("TESSERACT_CMD")
@@ -19,6 +38,111 @@ if TESSERACT_CMD:
 
 logger = logging.getLogger(__name__)
 
+# The status phrases ("Client Offline", "Authorization") are plain words, so
+# tesseract reads the capture as one text block (LSTM engine) and only has
+# to consider letters. Override with ANYDESK_TESSERACT_CONFIG if needed
+# (applies to the pytesseract fallback).
+ANYDESK_OCR_WHITELIST = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ANYDESK_TESSERACT_CONFIG = os.getenv(
+    "ANYDESK_TESSERACT_CONFIG",
+    f"--oem 1 --psm 6 -c tessedit_char_whitelist={ANYDESK_OCR_WHITELIST}",
+)
+
+# Status phrases in one pass over the OCR text. Case-insensitive, and
+# tolerant of lost spaces and of l / I / i mix-ups (the OCR whitelist is
+# letters only, so look-alikes such as 1 or | never come back).
+_STATUS_RE = re.compile(
+    r"(client\s*off[il]ine)|(author[il]zat[il]on)",
+    re.IGNORECASE,
+)
+
+# One resident tesserocr engine per OCR thread (model loaded once)
+_OCR_LOCAL = threading.local()
+
+# Optional template fast path: a folder with reference crops of the status
+# texts, captured once on the agent (client_offline.png, authorization.png).
+# Needs opencv-python-headless; without it or the folder, OCR is used alone.
+ANYDESK_TEMPLATE_DIR = os.getenv("ANYDESK_TEMPLATE_DIR", "")
+ANYDESK_TEMPLATE_THRESHOLD = float(os.getenv("ANYDESK_TEMPLATE_THRESHOLD", "0.9"))
+_STATUS_TEMPLATE_FILES = {
+    "Offline": "client_offline.png",
+    "Wrong Password": "authorization.png",
+}
+
+# Pool for the OCR step. pytesseract shells out to the tesseract binary, so
+# threads are enough to keep several cores busy while the desktop is used
+# for the next AnyDesk session.
+_OCR_EXECUTOR = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1,
+    thread_name_prefix="anydesk-ocr",
+)
+
+
+def _tesserocr_api():
+    """Return this thread's tesserocr engine, creating it on first use."""
+    api = getattr(_OCR_LOCAL, "api", None)
+    if api is None:
+        kwargs = {"lang": "eng", "oem": OEM.LSTM_ONLY, "psm": PSM.SINGLE_BLOCK}
+        if os.getenv("TESSDATA_PREFIX"):
+            kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+        api = PyTessBaseAPI(**kwargs)
+        api.SetVariable("tessedit_char_whitelist", ANYDESK_OCR_WHITELIST)
+        _OCR_LOCAL.api = api
+    return api
+
+
+def _ocr_text(gray: Image.Image) -> str:
+    """
+    OCR a grayscale capture. Uses an in-process tesserocr engine when
+    tesserocr is installed (no tesseract process or model load per call);
+    otherwise shells out through pytesseract.
+    """
+    if PyTessBaseAPI is not None:
+        api = _tesserocr_api()
+        # Hand over the raw 8-bit pixels; SetImage would re-encode the
+        # PIL image into an intermediate file format first
+        width, height = gray.size
+        api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+        return api.GetUTF8Text()
+    return pytesseract.image_to_string(gray, config=ANYDESK_TESSERACT_CONFIG)
+
+
+@lru_cache(maxsize=1)
+def _status_templates() -> Tuple[Tuple[str, Any], ...]:
+    """Load the grayscale status templates once; empty if unavailable."""
+    if cv2 is None or not ANYDESK_TEMPLATE_DIR:
+        return ()
+
+    templates = []
+    for status, filename in _STATUS_TEMPLATE_FILES.items():
+        path = os.path.join(ANYDESK_TEMPLATE_DIR, filename)
+        template = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+        if template is None:
+            logger.warning("AnyDesk status template not found or unreadable: %s", path)
+            continue
+        templates.append((status, template))
+    return tuple(templates)
+
+
+def _match_status_template(gray: Image.Image) -> Optional[str]:
+    """
+    Return the status whose template appears in the grayscale capture, or
+    None if no template matches (or templates are not configured).
+    """
+    templates = _status_templates()
+    if not templates:
+        return None
+
+    screen = np.asarray(gray)
+    for status, template in templates:
+        if template.shape[0] > screen.shape[0] or template.shape[1] > screen.shape[1]:
+            continue
+        scores = cv2.matchTemplate(screen, template, cv2.TM_CCOEFF_NORMED)
+        _, best, _, _ = cv2.minMaxLoc(scores)
+        if best >= ANYDESK_TEMPLATE_THRESHOLD:
+            return status
+    return None
+
 
 class AnyDeskClient:
     """
@@ -35,12 +159,6 @@ class AnyDeskClient:
         # status is one of: "Online", "Offline", "Wrong Password", "Errored"
     """
 
-    def __init__(self) -> None:
-        # Optionally override tesseract command via env
-        tesseract_cmd = os.getenv("TESSERACT_CMD")
-        if tesseract_cmd:
-            pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
-
     # ------------------------------------------------------------------ #
     # Public API
     # ------------------------------------------------------------------ #
@@ -64,36 +182,68 @@ class AnyDeskClient:
               - "Wrong Password"
               - "Errored"
         """
+        screenshot = self.capture_session(
+            anydesk_id,
+            password,
+            wait_for_window=wait_for_window,
+            wait_after_window=wait_after_window,
+        )
+        if screenshot is None:
+            return "Errored"
+
+        status = self._classify_status_from_image(screenshot)
+        logger.info(
+            "AnyDesk status for ID %s determined as: %s",
+            anydesk_id,
+            status,
+        )
+        return status
+
+    def capture_session(
+        self,
+        anydesk_id: str,
+        password: str,
+        *,
+        wait_for_window: int = 10,
+        wait_after_window: int = 5,
+    ) -> Optional[Image.Image]:
+        """
+        Desktop-bound half of `check_session`: open AnyDesk to the given ID,
+        log in, capture the screen and close AnyDesk again.
 
+        Returns the screenshot, or None if the session could not be captured.
+        """
         if not anydesk_id or not password:
             logger.error("AnyDesk ID or password missing.")
-            return "Errored"
+            return None
 
         try:
             self._launch_anydesk(anydesk_id, password)
             if not self._wait_for_anydesk_window(timeout=wait_for_window):
                 logger.error("AnyDesk window not found after %s seconds.", wait_for_window)
-                return "Errored"
+                return None
 
             # Give the UI a bit of time to settle
             time.sleep(wait_after_window)
-            screenshot = self._capture_screenshot()
-            if screenshot is None:
-                return "Errored"
-
-            status = self._classify_status_from_image(screenshot)
-            logger.info(
-                "AnyDesk status for ID %s determined as: %s",
-                anydesk_id,
-                status,
-            )
-            return status
+            return self._capture_screenshot()
         except Exception as exc:
-            logger.error("Unexpected error in AnyDeskClient.check_session: %s", exc, exc_info=True)
-            return "Errored"
+            logger.error("Unexpected error in AnyDeskClient.capture_session: %s", exc, exc_info=True)
+            return None
         finally:
             self.close_anydesk()
 
+    async def classify_status_async(self, image: Image.Image) -> str:
+        """
+        CPU-bound half of `check_session`: OCR a captured screenshot on the
+        shared OCR pool, so the desktop is free for the next session meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            _OCR_EXECUTOR,
+            self._classify_status_from_image,
+            image,
+        )
+
     # ------------------------------------------------------------------ #
     # Internal helpers
     # ------------------------------------------------------------------ #
@@ -115,13 +265,23 @@ class AnyDeskClient:
         subprocess.Popen(cmd, shell=True)
 
     def _wait_for_anydesk_window(self, timeout: int = 10) -> bool:
-        """Wait up to `timeout` seconds until an AnyDesk window appears."""
-        start = time.time()
-        while time.time() - start < timeout:
+        """
+        Wait up to `timeout` seconds until an AnyDesk window appears.
+
+        Polls every 0.1s at first, backing off to once a second, so a window
+        that opens quickly is seen right away without enumerating windows
+        ten times a second for the whole timeout.
+        """
+        deadline = time.monotonic() + timeout
+        interval = 0.1
+        while True:
             if self._anydesk_window_present():
                 return True
-            time.sleep(1)
-        return False
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, 1.0)
 
     @staticmethod
     def _anydesk_window_present() -> bool:
@@ -133,10 +293,37 @@ class AnyDeskClient:
 
         return any("AnyDesk" in title for title in titles)
 
+    @staticmethod
+    def _anydesk_region() -> Optional[tuple]:
+        """
+        Screen region (left, top, width, height) covering every AnyDesk
+        window, clamped to the screen, or None to capture the whole screen.
+        """
+        try:
+            windows = [w for w in gw.getWindowsWithTitle("AnyDesk") if w.width > 0 and w.height > 0]
+            if not windows:
+                return None
+            screen_width, screen_height = pyautogui.size()
+            left = max(0, min(w.left for w in windows))
+            top = max(0, min(w.top for w in windows))
+            right = min(screen_width, max(w.left + w.width for w in windows))
+            bottom = min(screen_height, max(w.top + w.height for w in windows))
+        except Exception as exc:
+            logger.debug("Could not locate AnyDesk windows, capturing full screen: %s", exc)
+            return None
+
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right - left, bottom - top
+
     @staticmethod
     def _capture_screenshot() -> Optional[Image.Image]:
+        """
+        Capture the area covered by AnyDesk windows (the whole screen if they
+        can't be located); OCR time grows with the captured pixel count.
+        """
         try:
-            screenshot = pyautogui.screenshot()
+            screenshot = pyautogui.screenshot(region=AnyDeskClient._anydesk_region())
             return screenshot
         except Exception as exc:
             logger.error("Failed to capture screenshot: %s", exc)
@@ -144,18 +331,34 @@ class AnyDeskClient:
 
     @staticmethod
     def _classify_status_from_image(image: Image.Image) -> str:
-        """Run OCR on the given image and classify the AnyDesk status."""
+        """
+        Classify the AnyDesk status from the given image.
+
+        Tries the template fast path first; OCR runs only when no template
+        matches (including every "Online" capture, which has no status text).
+        """
         try:
-            text = pytesseract.image_to_string(image)
+            # Grayscale is a third of the pixel data and all tesseract needs
+            gray = image if image.mode == "L" else image.convert("L")
+
+            status = _match_status_template(gray)
+            if status is not None:
+                return status
+
+            text = _ocr_text(gray)
         except Exception as exc:
             logger.error("Failed to run OCR on screenshot: %s", exc)
             return "Errored"
 
         logger.debug("AnyDesk OCR text: %s", text)
 
-        if "Client Offline" in text:
-            return "Offline"
-        if "Authorization" in text:
+        wrong_password = False
+        for match in _STATUS_RE.finditer(text):
+            # "Client Offline" wins if both phrases are on screen
+            if match.group(1):
+                return "Offline"
+            wrong_password = True
+        if wrong_password:
             return "Wrong Password"
 
         # Default assumption if no known error text is found
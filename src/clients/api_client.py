@@ -1,12 +1,59 @@
 import os
 import json
+import base64
 import logging
-from typing import Any, Dict, Optional, Union, Mapping
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Optional, Tuple, Union, Mapping
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
+# How long a getallwithduration response is reused before revalidating it
+OFFLINE_LICENSES_CACHE_TTL = float(os.getenv("OFFLINE_LICENSES_CACHE_TTL", "60"))
+
+# Cached GET responses kept per client; the oldest entry is dropped first
+RESPONSE_CACHE_MAX_ENTRIES = 256
+
+# A token this close to its expiry is treated as expired (seconds)
+TOKEN_EXPIRY_MARGIN = 60
+
+
+def _loads(content: bytes) -> Any:
+    """
+    Decode a JSON response body.
+
+    Uses orjson when installed (noticeably faster on the large license
+    dumps); falls back to the stdlib decoder otherwise. Raises ValueError
+    on invalid JSON either way.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+def _jwt_expiry(token: Optional[str]) -> Optional[float]:
+    """
+    Return the `exp` claim (epoch seconds) of a JWT, or None if the token
+    is not a JWT or has no expiry. The signature is not checked; this only
+    decides whether logging in again is worthwhile.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return float(claims["exp"])
+    except Exception:
+        return None
+
 
 class APIClient:
     """
@@ -24,14 +71,44 @@ class APIClient:
         password: Optional[str] = None,
         token_file: str = "tokens.json",
     ) -> None:
-        self.base_url = (base_url or os.getenv("NC_API_BASE_URL", "")).rstrip("/")
+        self.base_url = (
+            base_url or os.getenv("NC_API_BASE_URL", "https://nctvapi.n-compass.online")
+        ).rstrip("/")
         self.username = username or os.getenv("NC_API_USERNAME", "")
         self.password = password or os.getenv("NC_API_PASSWORD", "")
         self.token_file = token_file
 
         self.session = requests.Session()
+        # Pooled keep-alive connections; idempotent requests retry on
+        # transient gateway errors without surfacing them to callers.
+        self.session.mount(
+            "https://",
+            HTTPAdapter(
+                pool_connections=16,
+                pool_maxsize=32,
+                max_retries=Retry(
+                    total=3,
+                    backoff_factor=0.5,
+                    status_forcelist=(502, 503, 504),
+                ),
+            ),
+        )
+        self.session.headers["Connection"] = "keep-alive"
         self.token: Optional[str] = None
         self.refresh_token: Optional[str] = None
+        self.token_expires_at: Optional[float] = None
+        # Serializes the login check so threads sharing this client don't
+        # all log in at once on a cold start
+        self._auth_lock = threading.Lock()
+
+        # Conditional-GET cache: (path, params) -> (fetched_at, validators, data).
+        # Checks share this client across threads, so every read and write
+        # of the dict goes through _cache_lock.
+        self._cache_lock = threading.Lock()
+        self._conditional_cache: Dict[
+            Tuple[str, Tuple[Tuple[str, str], ...]],
+            Tuple[float, Dict[str, str], Any],
+        ] = {}
 
         self._load_tokens()
 
@@ -49,7 +126,10 @@ class APIClient:
     # --------------------------------------------------------------------- #
 
     def _load_tokens(self) -> None:
-        """Try to load token and refresh token from disk."""
+        """
+        Try to load token, refresh token, token expiry and the session's auth
+        cookies from disk, so a fresh process can reuse a still-valid login.
+        """
         if not os.path.exists(self.token_file):
             return
 
@@ -58,22 +138,41 @@ class APIClient:
                 data = json.load(f)
             self.token = data.get("token")
             self.refresh_token = data.get("refreshToken")
+            self.token_expires_at = data.get("expiresAt") or _jwt_expiry(self.token)
+            self.session.cookies.update(data.get("cookies") or {})
             logger.info("Loaded tokens from %s", self.token_file)
         except Exception as exc:
             logger.warning("Failed to load tokens from %s: %s", self.token_file, exc)
 
     def _save_tokens(self) -> None:
-        """Persist token and refresh token to disk for reuse."""
+        """Persist token, refresh token, expiry and auth cookies for reuse."""
         if not self.token:
             return
 
-        data = {"token": self.token, "refreshToken": self.refresh_token}
+        data = {
+            "token": self.token,
+            "refreshToken": self.refresh_token,
+            "expiresAt": self.token_expires_at,
+            "cookies": self.session.cookies.get_dict(),
+        }
+        # Write a temp file and swap it in, so a crash mid-write never leaves
+        # a truncated token file behind (os.replace is atomic on NTFS too)
+        tmp_file = f"{self.token_file}.{os.getpid()}.{threading.get_ident()}.tmp"
         try:
-            with open(self.token_file, "w", encoding="utf-8") as f:
+            with open(tmp_file, "w", encoding="utf-8") as f:
                 json.dump(data, f)
+            try:
+                os.chmod(tmp_file, 0o600)
+            except OSError:
+                pass
+            os.replace(tmp_file, self.token_file)
             logger.info("Saved tokens to %s", self.token_file)
         except Exception as exc:
             logger.warning("Failed to save tokens to %s: %s", self.token_file, exc)
+            try:
+                os.remove(tmp_file)
+            except OSError:
+                pass
 
     # --------------------------------------------------------------------- #
     # Authentication
@@ -130,6 +229,7 @@ class APIClient:
 
         self.token = token
         self.refresh_token = refresh
+        self.token_expires_at = _jwt_expiry(token)
         self.session.headers.update({"Authorization": f"Bearer {self.token}"})
         self._save_tokens()
 
@@ -147,21 +247,53 @@ class APIClient:
         {"message": "cookie is required!"}.
 
         To keep things robust we treat BOTH token and cookies as required.
-        If either is missing we trigger a fresh login() so the session picks up
-        the token and the cookie again.
+        Both are persisted in the token file, so a new process whose saved
+        login is still valid makes no login request. If either is missing, or
+        the token's JWT expiry has (nearly) passed, we trigger a fresh login()
+        so the session picks up the token and the cookie again.
         """
-        has_token = bool(self.token)
-        has_cookies = bool(self.session.cookies)
-
-        if has_token and has_cookies:
+        if self._has_fresh_auth():
             return True
 
-        logger.info(
-            "Auth context incomplete (token=%s, cookies=%s); attempting login...",
-            "yes" if has_token else "no",
-            "yes" if has_cookies else "no",
+        with self._auth_lock:
+            # Another thread may have logged in while we waited
+            if self._has_fresh_auth():
+                return True
+
+            logger.info(
+                "Auth context incomplete (token=%s, cookies=%s, expired=%s); attempting login...",
+                "yes" if self.token else "no",
+                "yes" if self.session.cookies else "no",
+                "yes" if self._token_expired() else "no",
+            )
+            return self.login()
+
+    def _relogin(self, rejected_token: Optional[str]) -> bool:
+        """
+        Log in again after the server rejected `rejected_token`.
+
+        Runs under the same lock as _ensure_auth, so when several threads
+        hit the rejection together only the first logs in; the others find
+        a different, fresh token and reuse it.
+        """
+        with self._auth_lock:
+            if self.token != rejected_token and self._has_fresh_auth():
+                return True
+
+            self.token = None
+            self.session.headers.pop("Authorization", None)
+            return self.login()
+
+    def _has_fresh_auth(self) -> bool:
+        """True if we hold a token that is not about to expire plus cookies."""
+        return bool(self.token) and bool(self.session.cookies) and not self._token_expired()
+
+    def _token_expired(self) -> bool:
+        """True if the token's known expiry is within TOKEN_EXPIRY_MARGIN."""
+        return (
+            self.token_expires_at is not None
+            and self.token_expires_at <= time.time() + TOKEN_EXPIRY_MARGIN
         )
-        return self.login()
 
 
     # --------------------------------------------------------------------- #
@@ -176,10 +308,20 @@ class APIClient:
         params: Optional[Mapping[str, Any]] = None,
         json_body: Optional[Dict[str, Any]] = None,
         retry_on_401: bool = True,
+        timeout: int = 30,
+        conditional_ttl: Optional[float] = None,
     ) -> Optional[Union[Dict[str, Any], Any]]:
         """
         Internal helper to make an authenticated request and return response.json().
 
+        When `conditional_ttl` is given (GET only), the parsed response is
+        kept per path + params:
+          - within `conditional_ttl` seconds it is returned without a request;
+          - after that the request carries If-None-Match / If-Modified-Since
+            from the cached response, and a 304 reuses the cached body.
+        Cached payloads are handed to every caller as the same object, so
+        callers must treat them as read-only.
+
         Returns:
             Parsed JSON (dict/list/whatever response is), or None on error.
         """
@@ -192,25 +334,49 @@ class APIClient:
 
         url = f"{self.base_url}{path}"
 
+        cache_key = None
+        cached = None
+        headers: Dict[str, str] = {}
+        if conditional_ttl is not None and method.upper() == "GET":
+            cache_key = (
+                path,
+                tuple(sorted((str(k), str(v)) for k, v in (params or {}).items())),
+            )
+            with self._cache_lock:
+                cached = self._conditional_cache.get(cache_key)
+            if cached is not None:
+                fetched_at, validators, data = cached
+                if time.monotonic() - fetched_at < conditional_ttl:
+                    logger.debug("Serving %s from cache (age < %ss).", url, conditional_ttl)
+                    return data
+                headers.update(validators)
+
+        # The token this request goes out with, to tell on a 401 whether
+        # another thread has logged in again since
+        sent_token = self.token
         try:
             resp = self.session.request(
                 method=method.upper(),
                 url=url,
                 params=params,
                 json=json_body,
-                timeout=30,
+                headers=headers or None,
+                timeout=timeout,
             )
         except requests.RequestException as exc:
             logger.error("Request to %s failed: %s", url, exc)
             return None
 
-        # Handle unauthorized – try a single re-login & retry
-        if resp.status_code == 401 and retry_on_401:
-            logger.warning("Received 401 from %s, retrying after re-login...", url)
-            self.token = None
-            self.session.headers.pop("Authorization", None)
-
-            if not self.login():
+        # Handle unauthorized (or a restored cookie the server no longer
+        # accepts) – try a single re-login & retry
+        cookie_rejected = not resp.ok and b"cookie is required" in resp.content[:200]
+        if (resp.status_code == 401 or cookie_rejected) and retry_on_401:
+            logger.warning(
+                "Received %s (auth rejected) from %s, retrying after re-login...",
+                resp.status_code,
+                url,
+            )
+            if not self._relogin(sent_token):
                 logger.error("Re-login failed; giving up on %s", url)
                 return None
 
@@ -220,8 +386,16 @@ class APIClient:
                 params=params,
                 json_body=json_body,
                 retry_on_401=False,
+                timeout=timeout,
+                conditional_ttl=conditional_ttl,
             )
 
+        if resp.status_code == 304 and cached is not None:
+            logger.info("%s not modified; reusing cached response.", url)
+            with self._cache_lock:
+                self._conditional_cache[cache_key] = (time.monotonic(), cached[1], cached[2])
+            return cached[2]
+
         if not resp.ok:
             logger.error(
                 "Request to %s failed: %s %s - %s",
@@ -236,12 +410,26 @@ class APIClient:
             return None
 
         try:
-            return resp.json()
+            data = _loads(resp.content)
         except ValueError:
             # Not JSON – return raw text as a fallback
             logger.debug("Non-JSON response from %s, returning text.", url)
             return resp.text
 
+        if cache_key is not None:
+            validators: Dict[str, str] = {}
+            if resp.headers.get("ETag"):
+                validators["If-None-Match"] = resp.headers["ETag"]
+            if resp.headers.get("Last-Modified"):
+                validators["If-Modified-Since"] = resp.headers["Last-Modified"]
+            with self._cache_lock:
+                self._conditional_cache[cache_key] = (time.monotonic(), validators, data)
+                if len(self._conditional_cache) > RESPONSE_CACHE_MAX_ENTRIES:
+                    # Dicts keep insertion order, so the first key is the oldest
+                    self._conditional_cache.pop(next(iter(self._conditional_cache)), None)
+
+        return data
+
     # --------------------------------------------------------------------- #
     # Convenience methods
     # --------------------------------------------------------------------- #
@@ -252,6 +440,9 @@ class APIClient:
 
         `params` is passed straight through to the API. You can supply any filters
         you need (page, pageSize, piStatus, active, assigned, timezone, etc.).
+
+        Never cached: every caller pages through the list once per run and
+        needs the current state.
         """
         return self._request("GET", "/api/license/getall", params=params)
 
@@ -267,3 +458,55 @@ class APIClient:
 
         params = {"licenseid": license_id}
         return self._request("GET", "/api/pi/getfiles", params=params)
+
+    def get_offline_licenses(self, days_from: int = 6, days_to: int = 30) -> Optional[Any]:
+        """
+        Fetch all licenses offline between `days_from` and `days_to` days from
+        /api/license/getallwithduration.
+
+        Uses the same parameters as the portal (page=0 / pageSize=0 means
+        "all"), so the response can be large; the timeout is raised to match.
+
+        The response is cached for OFFLINE_LICENSES_CACHE_TTL seconds and then
+        revalidated with a conditional GET, so back-to-back checks in the same
+        process do not download the full dump again. The returned payload may
+        be shared with other callers; treat it as read-only.
+        """
+        params = {
+            "page": 0,
+            "search": "",
+            "sortColumn": "TimeIn",
+            "sortOrder": "desc",
+            "pageSize": 0,          # backend uses 0 here to mean "all"
+            "includeAdmin": "false",
+            "piStatus": 0,
+            "daysOfflineFrom": days_from,
+            "daysOfflineTo": days_to,
+            "active": "",
+            "daysInstalled": "",
+            "timezone": "",
+            "dealerId": "",
+            "hostId": "",
+            "assigned": "",
+            "pending": "",
+            "online": "",
+            "isActivated": "",
+        }
+        return self._request(
+            "GET",
+            "/api/license/getallwithduration",
+            params=params,
+            timeout=60,
+            conditional_ttl=OFFLINE_LICENSES_CACHE_TTL,
+        )
+
+
+@lru_cache(maxsize=1)
+def get_api_client() -> APIClient:
+    """
+    Return the process-wide APIClient.
+
+    Checks that run in the same scheduler process share one session, one
+    login token and one connection pool instead of logging in separately.
+    """
+    return APIClient()
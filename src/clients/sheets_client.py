@@ -1,15 +1,256 @@
+import hashlib
+import json
 import os
+import re
 import logging
-from typing import Any, List, Optional
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple, TypeVar
 
 import gspread
 from google.oauth2.service_account import Credentials
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 # Default scope: full access to spreadsheets
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
+# Header rows known to be correct, kept across restarts so ensure_headers
+# needs no request at all for them: {spreadsheet id: {worksheet id: digest}}
+SHEETS_HEADER_CACHE_FILE = os.getenv("SHEETS_HEADER_CACHE_FILE", "sheets_headers.json")
+
+_header_cache_lock = threading.Lock()
+_header_cache_enabled = True
+
+# Opt-in: keep the service account's access token in SHEETS_TOKEN_CACHE_FILE
+# so a restart reuses it instead of signing and exchanging a new JWT
+NC_TOKEN_CACHE = os.getenv("NC_TOKEN_CACHE", "0") == "1"
+SHEETS_TOKEN_CACHE_FILE = os.getenv("SHEETS_TOKEN_CACHE_FILE", "sheets_token.json")
+
+# Seconds a cached access token must still be valid for to be reused
+SHEETS_TOKEN_MIN_LIFETIME = 60
+
+
+def _write_json_file(path: str, data: Any, private: bool = False) -> None:
+    """
+    Write `data` as JSON to `path` via a temp file and os.replace (the same
+    swap as the API token file), so a crash mid-write never leaves a
+    truncated file behind. `private` makes the file owner-only.
+    Failures are logged, not raised.
+    """
+    tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        if private:
+            try:
+                os.chmod(tmp_file, 0o600)
+            except OSError:
+                pass
+        os.replace(tmp_file, path)
+    except Exception as exc:
+        logger.warning("Failed to save %s: %s", path, exc)
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def disable_header_cache() -> None:
+    """
+    Make ensure_headers read the header rows again instead of trusting
+    SHEETS_HEADER_CACHE_FILE (e.g. after someone edited them by hand).
+    What it finds is still saved for the next start.
+    """
+    global _header_cache_enabled
+    _header_cache_enabled = False
+
+
+def _headers_digest(headers: Tuple[str, ...]) -> str:
+    """Short, stable fingerprint of a header row."""
+    return hashlib.blake2b(
+        json.dumps(list(headers)).encode("utf-8"),
+        digest_size=8,
+    ).hexdigest()
+
+
+def _load_header_cache() -> Dict[str, Dict[str, str]]:
+    """Read SHEETS_HEADER_CACHE_FILE; a missing or broken file is empty."""
+    try:
+        with open(SHEETS_HEADER_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as exc:
+        logger.warning("Failed to load header cache from %s: %s", SHEETS_HEADER_CACHE_FILE, exc)
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _save_header_digests(spreadsheet_id: str, digests: Dict[str, str]) -> None:
+    """Merge `digests` for one spreadsheet into SHEETS_HEADER_CACHE_FILE."""
+    with _header_cache_lock:
+        data = _load_header_cache()
+        saved = data.setdefault(spreadsheet_id, {})
+        if all(saved.get(ws_id) == digest for ws_id, digest in digests.items()):
+            return
+        saved.update(digests)
+        _write_json_file(SHEETS_HEADER_CACHE_FILE, data)
+
+
+def _prune_header_digests(spreadsheet_id: str, live_ids: Set[str]) -> None:
+    """
+    Drop the saved digests of `spreadsheet_id`'s worksheets that are not in
+    `live_ids`, so deleted tabs don't pile up in SHEETS_HEADER_CACHE_FILE.
+    """
+    with _header_cache_lock:
+        data = _load_header_cache()
+        saved = data.get(spreadsheet_id)
+        if not saved:
+            return
+        stale = [ws_id for ws_id in saved if ws_id not in live_ids]
+        if not stale:
+            return
+        for ws_id in stale:
+            del saved[ws_id]
+        _write_json_file(SHEETS_HEADER_CACHE_FILE, data)
+
+
+class _TokenCachingCredentials(Credentials):
+    """Service-account credentials that save every new access token."""
+
+    def refresh(self, request) -> None:
+        super().refresh(request)
+        _save_sheets_token(self)
+
+
+def _utcnow() -> datetime:
+    """Naive UTC now, matching google-auth's credential expiry."""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _load_sheets_token(creds) -> None:
+    """
+    Put the cached access token on `creds` if it belongs to the same
+    service account and is valid for at least SHEETS_TOKEN_MIN_LIFETIME.
+    Otherwise leave `creds` alone, so the first request fetches a token.
+    """
+    try:
+        with open(SHEETS_TOKEN_CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("client_email") != creds.service_account_email:
+            return
+        expiry = datetime.fromisoformat(data["expiry"])
+        if expiry - _utcnow() < timedelta(seconds=SHEETS_TOKEN_MIN_LIFETIME):
+            return
+        token = data["token"]
+    except FileNotFoundError:
+        return
+    except Exception as exc:
+        logger.warning("Failed to load Sheets token from %s: %s", SHEETS_TOKEN_CACHE_FILE, exc)
+        return
+
+    creds.token = token
+    creds.expiry = expiry
+    logger.info("Reusing cached Sheets access token (expires %s UTC)", expiry)
+
+
+def _save_sheets_token(creds) -> None:
+    """Persist the current access token of `creds` for later processes."""
+    if not creds.token or creds.expiry is None:
+        return
+
+    _write_json_file(
+        SHEETS_TOKEN_CACHE_FILE,
+        {
+            "client_email": creds.service_account_email,
+            "token": creds.token,
+            "expiry": creds.expiry.isoformat(),
+        },
+        private=True,
+    )
+
+
+@lru_cache(maxsize=8)
+def open_spreadsheet(spreadsheet_id: str, credentials_file: str):
+    """
+    Authorize gspread and open a spreadsheet by key, once per process.
+
+    Every SheetsClient (and the tab reordering in screenshot_health) goes
+    through here, so the service-account file is parsed and the OAuth
+    client authorized only once per (spreadsheet, credentials) pair.
+    Failures are not cached, so a later call retries the login.
+
+    With NC_TOKEN_CACHE=1 the access token is also kept across restarts
+    (see _load_sheets_token).
+    """
+    if NC_TOKEN_CACHE:
+        creds = _TokenCachingCredentials.from_service_account_file(
+            credentials_file,
+            scopes=SCOPES,
+        )
+        _load_sheets_token(creds)
+    else:
+        creds = Credentials.from_service_account_file(
+            credentials_file,
+            scopes=SCOPES,
+        )
+    gc = gspread.authorize(creds)
+    _tune_session(gc)
+    return gc.open_by_key(spreadsheet_id)
+
+
+class _SheetsRetry(Retry):
+    """
+    urllib3 Retry that also replays POSTs, but only after a 429.
+
+    A quota rejection means nothing was written, so retrying an append or
+    batchUpdate is safe then; after a 5xx it might have been applied
+    already, so POSTs are not replayed for those.
+    """
+
+    def is_retry(self, method: str, status_code: int, has_retry_after: bool = False) -> bool:
+        if method and method.upper() == "POST":
+            return bool(self.total) and status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def _tune_session(gc) -> None:
+    """
+    Give gspread's authorized session a larger keep-alive pool and retries.
+
+    The screenshot workers and parallel zone checks share one client, so
+    the default pool of 10 connections would churn. Quota (429) and server
+    errors are retried with exponential backoff, honoring Retry-After;
+    see _SheetsRetry for which POSTs are replayed. When retries run out
+    the last response is returned, so gspread still raises its APIError.
+    """
+    http_client = getattr(gc, "http_client", None)  # gspread >= 6
+    session = getattr(http_client, "session", None) or getattr(gc, "session", None)
+    if session is None:
+        return
+
+    session.mount(
+        "https://",
+        HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=_SheetsRetry(
+                total=5,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            ),
+        ),
+    )
+
 
 class SheetsClient:
     """
@@ -44,12 +285,72 @@ class SheetsClient:
             self.spreadsheet_id,
         )
 
-        creds = Credentials.from_service_account_file(
-            self.credentials_file,
-            scopes=SCOPES,
+        self.spreadsheet = open_spreadsheet(self.spreadsheet_id, self.credentials_file)
+
+        # Worksheet handles by title, and (worksheet id, headers) pairs whose
+        # header row is known to be correct, so repeated runs with the same
+        # client skip those lookups
+        self._ws_cache: Dict[str, Any] = {}
+        self._ws_listed = False
+        self._headers_verified: Set[Tuple[int, Tuple[str, ...]]] = set()
+        # {worksheet id: headers digest} saved by earlier processes
+        self._header_digests: Dict[str, str] = dict(
+            _load_header_cache().get(self.spreadsheet_id) or {}
+        )
+        # Ids of worksheets this client created whose header row is still
+        # blank, so ensure_headers can write without reading it first
+        self._blank_worksheets: Set[int] = set()
+
+        # Inside format_batch(): spreadsheet batchUpdate requests waiting to
+        # be sent together, and header checks that count once they are sent
+        self._pending_requests: Optional[List[Dict[str, Any]]] = None
+        self._pending_headers: List[Tuple[int, Tuple[str, ...]]] = []
+
+    # ------------------------------------------------------------------ #
+    # Request batching
+    # ------------------------------------------------------------------ #
+
+    @contextmanager
+    def format_batch(self) -> Iterator[None]:
+        """
+        Collect the formatting/header requests made inside the block and
+        send them as a single spreadsheets.batchUpdate when it exits.
+
+            with sheets.format_batch():
+                sheets.ensure_headers(ws, headers)
+                sheets.set_column_widths(ws, 1, 10, 200)
+                sheets.set_horizontal_alignment(ws, 1, 10, "LEFT")
+
+        Failures of the combined call are logged, like the individual
+        helpers do.
+        """
+        if self._pending_requests is not None:
+            # Already batching; the outer block sends everything
+            yield
+            return
+
+        self._pending_requests = []
+        try:
+            yield
+        finally:
+            requests, self._pending_requests = self._pending_requests, None
+            headers, self._pending_headers = self._pending_headers, []
+            if requests:
+                try:
+                    logger.info("Sending %s batched sheet requests", len(requests))
+                    self._post_batch_update(requests)
+                    self._remember_headers(headers)
+                except Exception as exc:
+                    logger.warning("Failed to send batched sheet requests: %s", exc)
+
+    def _post_batch_update(self, requests: List[Dict[str, Any]]) -> None:
+        """POST `requests` to the spreadsheet's batchUpdate endpoint."""
+        client = self.spreadsheet.client
+        client.request(
+            "post",
+            f"https://sheets.googleapis.com/v4/spreadsheets/{self.spreadsheet.id}:batchUpdate",
+            json={"requests": requests},
         )
-        gc = gspread.authorize(creds)
-        self.spreadsheet = gc.open_by_key(self.spreadsheet_id)
 
     # ------------------------------------------------------------------ #
     # Worksheet helpers
@@ -64,54 +365,171 @@ class SheetsClient:
         """
         Return an existing worksheet with the given title, or create it.
 
-        rows/cols are only used when creating a new worksheet.
+        rows/cols are only used when creating a new worksheet. Handles are
+        cached per title for the life of this client; the first miss loads
+        every worksheet with one metadata request, so looking up the other
+        tabs afterwards costs nothing, and a title missing from that listing
+        is created straight away. Use with_worksheet for work that should
+        survive the tab being deleted or renamed by hand.
         """
-        try:
-            ws = self.spreadsheet.worksheet(title)
+        ws = self._ws_cache.get(title)
+        if ws is not None:
             return ws
-        except gspread.WorksheetNotFound:
-            logger.info("Worksheet '%s' not found. Creating...", title)
-            return self.spreadsheet.add_worksheet(
-                title=title,
-                rows=str(rows),
-                cols=str(cols),
-            )
+
+        if not self._ws_listed:
+            self._list_worksheets()
+            ws = self._ws_cache.get(title)
+            if ws is not None:
+                return ws
+
+        logger.info("Worksheet '%s' not found. Creating...", title)
+        ws = self.spreadsheet.add_worksheet(
+            title=title,
+            rows=str(rows),
+            cols=str(cols),
+        )
+        self._blank_worksheets.add(ws.id)
+        self._ws_cache[title] = ws
+        return ws
+
+    def _list_worksheets(self) -> None:
+        """
+        Replace the cached handles with one fresh worksheets() listing, and
+        forget saved header digests of worksheets that no longer exist.
+        """
+        self._ws_cache = {ws.title: ws for ws in self.spreadsheet.worksheets()}
+        self._ws_listed = True
+
+        live_ids = {str(ws.id) for ws in self._ws_cache.values()}
+        self._header_digests = {
+            ws_id: digest
+            for ws_id, digest in self._header_digests.items()
+            if ws_id in live_ids
+        }
+        _prune_header_digests(self.spreadsheet_id, live_ids)
+
+    def with_worksheet(
+        self,
+        title: str,
+        action: Callable[[Any], T],
+        rows: int = 1000,
+        cols: int = 20,
+    ) -> T:
+        """
+        Run `action(ws)` on the worksheet `title` (created if missing) and
+        return its result.
+
+        Cached handles outlive tabs that are deleted or renamed by hand. If
+        `action` fails with an APIError and a fresh listing shows the tab is
+        gone, the tab is looked up (or re-created) again and `action`
+        retried once; any other APIError is re-raised.
+        """
+        ws = self.get_or_create_worksheet(title, rows=rows, cols=cols)
+        try:
+            return action(ws)
+        except (gspread.exceptions.APIError, gspread.WorksheetNotFound) as exc:
+            try:
+                self._list_worksheets()
+            except Exception:
+                raise exc
+            current = self._ws_cache.get(title)
+            if current is not None and current.id == ws.id:
+                raise
+
+        logger.warning("Worksheet '%s' was deleted or renamed; retrying on a fresh handle.", title)
+        return action(self.get_or_create_worksheet(title, rows=rows, cols=cols))
 
     def ensure_headers(self, ws, headers: List[str]) -> None:
         """
         Ensure the first row of the worksheet is exactly `headers`.
         Overwrites row 1 if needed.
+
+        Once checked (or written) for a worksheet, the same headers are not
+        read again by this client, nor after a restart (see
+        SHEETS_HEADER_CACHE_FILE). Worksheets this client just created are
+        written without reading row 1 first.
         """
-        try:
-            existing = ws.row_values(1)
-        except Exception as exc:
-            logger.warning("Failed to read header row from '%s': %s", ws.title, exc)
+        key = (ws.id, tuple(headers))
+        if key in self._headers_verified:
+            return
+
+        if (
+            _header_cache_enabled
+            and self._header_digests.get(str(ws.id)) == _headers_digest(key[1])
+        ):
+            self._headers_verified.add(key)
+            return
+
+        if ws.id in self._blank_worksheets:
             existing = []
+        else:
+            try:
+                existing = ws.row_values(1)
+            except Exception as exc:
+                logger.warning("Failed to read header row from '%s': %s", ws.title, exc)
+                existing = []
 
         if existing == headers:
+            self._remember_headers([key])
             return
 
         logger.info("Updating headers for worksheet '%s'", ws.title)
+        self._blank_worksheets.discard(ws.id)
+        if self._pending_requests is not None:
+            self._pending_requests.append({
+                "updateCells": {
+                    "start": {"sheetId": ws.id, "rowIndex": 0, "columnIndex": 0},
+                    "rows": [{
+                        "values": [
+                            {"userEnteredValue": {"stringValue": str(h)}} for h in headers
+                        ]
+                    }],
+                    "fields": "userEnteredValue",
+                }
+            })
+            self._pending_headers.append(key)
+            return
+
         ws.update("1:1", [headers])
+        self._remember_headers([key])
+
+    def _remember_headers(self, keys: List[Tuple[int, Tuple[str, ...]]]) -> None:
+        """Record (worksheet id, headers) pairs as correct, here and on disk."""
+        if not keys:
+            return
+        self._headers_verified.update(keys)
+        digests = {str(ws_id): _headers_digest(headers) for ws_id, headers in keys}
+        self._header_digests.update(digests)
+        _save_header_digests(self.spreadsheet_id, digests)
 
     # ------------------------------------------------------------------ #
     # Row helpers
     # ------------------------------------------------------------------ #
 
-    def find_row_by_value(self, ws, value, col: int = 1) -> Optional[int]:
+    def find_row_by_value(
+        self,
+        ws,
+        value,
+        col: int = 1,
+    ) -> Optional[int]:
         """
         Return the row index of the first cell in column `col` that matches `value`.
 
-        Works with both old and new gspread versions. If nothing is found or any
-        lookup error happens, returns None.
+        Reads just that column (one request, instead of ws.find() fetching
+        the whole sheet); nothing is cached, so the result always reflects
+        the sheet as it is now. To look up many values, build an index once
+        with read_key_index. The header row is never matched. If nothing is
+        found or the column can't be read, returns None.
         """
         try:
-            cell = ws.find(str(value), in_column=col)
-            return cell.row if cell is not None else None
-        except Exception:
-            # In gspread 6.x there is no CellNotFound anymore; any lookup
-            # failure just bubbles as a generic exception. We treat that
-            # as "not found".
+            return self.read_key_index(ws, key_col=col).get(str(value))
+        except Exception as exc:
+            logger.warning(
+                "Failed to read column %s of worksheet '%s': %s",
+                col,
+                getattr(ws, "title", "<unknown>"),
+                exc,
+            )
             return None
 
     def upsert_row(
@@ -130,7 +548,9 @@ class SheetsClient:
         row_index = self.find_row_by_value(ws, key_value, col=key_col)
 
         if row_index is not None:
-            range_str = f"{row_index}:{row_index}"
+            # Anchor at column A: Sheets sizes the range to the values, so
+            # only the supplied cells are written, not the whole row
+            range_str = f"A{row_index}"
             logger.debug(
                 "Updating row %s in worksheet '%s' (key=%s)",
                 row_index,
@@ -145,7 +565,122 @@ class SheetsClient:
                 key_value,
             )
             ws.append_row(values, value_input_option="USER_ENTERED")
-    
+
+    def read_key_index(self, ws, key_col: int = 1) -> Dict[str, int]:
+        """
+        Map each non-empty value in column `key_col` to its row index.
+
+        Row 1 is treated as the header and skipped. If a key appears more
+        than once, the first row wins (same as find_row_by_value).
+        """
+        keys = ws.col_values(key_col)
+        index: Dict[str, int] = {}
+        for row_idx, key in enumerate(keys[1:], start=2):
+            if key and key not in index:
+                index[key] = row_idx
+        return index
+
+    def upsert_rows(
+        self,
+        ws,
+        rows: List[List[Any]],
+        key_col: int = 1,
+        row_index: Optional[Dict[str, int]] = None,
+    ) -> None:
+        """
+        Batch version of upsert_row for many rows at once.
+
+        The key of each row is `row[key_col - 1]`. The key column is read once
+        (unless `row_index` from read_key_index is passed in); existing rows
+        are rewritten with a single values.batchUpdate and the rest are
+        appended with a single append call.
+
+        A passed-in `row_index` is kept up to date with the appended rows, so
+        callers writing in several batches only read the key column once.
+        """
+        if not rows:
+            return
+
+        if row_index is None:
+            row_index = self.read_key_index(ws, key_col=key_col)
+
+        updates: List[Dict[str, Any]] = []
+        new_rows: List[List[Any]] = []
+        for values in rows:
+            idx = row_index.get(str(values[key_col - 1]))
+            if idx is None:
+                new_rows.append(values)
+            else:
+                updates.append({"range": f"A{idx}", "values": [values]})
+
+        logger.debug(
+            "Upserting rows in worksheet '%s': %s updated, %s appended",
+            ws.title,
+            len(updates),
+            len(new_rows),
+        )
+        if updates:
+            ws.batch_update(updates, value_input_option="USER_ENTERED")
+        if new_rows:
+            resp = ws.append_rows(new_rows, value_input_option="USER_ENTERED")
+            self._index_appended_rows(ws, resp, new_rows, row_index, key_col)
+
+    def _index_appended_rows(
+        self,
+        ws,
+        append_response: Any,
+        new_rows: List[List[Any]],
+        row_index: Dict[str, int],
+        key_col: int,
+    ) -> None:
+        """
+        Record the rows written by append_rows in `row_index`.
+
+        The append response reports the range it wrote (e.g. "'Tab'!A57:J60");
+        if that is missing, the key column is re-read instead.
+        """
+        updated_range = ""
+        if isinstance(append_response, dict):
+            updated_range = (append_response.get("updates") or {}).get("updatedRange", "")
+
+        match = re.search(r"![A-Z]+(\d+)", updated_range or "")
+        if not match:
+            row_index.clear()
+            row_index.update(self.read_key_index(ws, key_col=key_col))
+            return
+
+        first_row = int(match.group(1))
+        for offset, values in enumerate(new_rows):
+            row_index.setdefault(str(values[key_col - 1]), first_row + offset)
+
+    def replace_all(self, ws, headers: List[str], rows: List[List[Any]]) -> None:
+        """
+        Make the worksheet contain exactly `headers` followed by `rows`.
+
+        At most two API calls regardless of the row count: one write of the
+        whole table from A1, then one clear of any old rows below it. Writing
+        before clearing means readers never see an empty sheet. The grid is
+        grown first if the table doesn't fit, and the clear is skipped when
+        the table reaches the last grid row.
+        """
+        values = [headers] + rows
+
+        if len(values) > ws.row_count:
+            ws.add_rows(len(values) - ws.row_count)
+        if len(headers) > ws.col_count:
+            ws.add_cols(len(headers) - ws.col_count)
+
+        ws.update("A1", values, value_input_option="USER_ENTERED")
+
+        if len(values) < ws.row_count:
+            last_col = re.sub(r"\d", "", gspread.utils.rowcol_to_a1(1, len(headers)))
+            ws.batch_clear([f"A{len(values) + 1}:{last_col}{ws.row_count}"])
+        logger.debug(
+            "Replaced contents of worksheet '%s' with %s rows",
+            ws.title,
+            len(rows),
+        )
+
     def set_column_widths(
         self,
         ws,
@@ -157,7 +692,8 @@ class SheetsClient:
         Set the width (in pixels) for a range of columns in the given worksheet.
 
         Columns are 1-based (A=1, B=2, ...), and end_col is inclusive.
-        This uses the low-level Google Sheets API via gspread's client.
+        This uses the low-level Google Sheets API via gspread's client;
+        inside format_batch() the request is queued instead of sent.
         """
         # gspread Worksheet exposes the underlying sheetId as .id
         try:
@@ -176,21 +712,17 @@ class SheetsClient:
         start_index = start_col - 1
         end_index = end_col
 
-        body = {
-            "requests": [
-                {
-                    "updateDimensionProperties": {
-                        "range": {
-                            "sheetId": sheet_id,
-                            "dimension": "COLUMNS",
-                            "startIndex": start_index,
-                            "endIndex": end_index,
-                        },
-                        "properties": {"pixelSize": pixel_size},
-                        "fields": "pixelSize",
-                    }
-                }
-            ]
+        request = {
+            "updateDimensionProperties": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "dimension": "COLUMNS",
+                    "startIndex": start_index,
+                    "endIndex": end_index,
+                },
+                "properties": {"pixelSize": pixel_size},
+                "fields": "pixelSize",
+            }
         }
 
         try:
@@ -201,12 +733,10 @@ class SheetsClient:
                 end_col,
                 pixel_size,
             )
-            client = self.spreadsheet.client
-            client.request(
-                "post",
-                f"https://sheets.googleapis.com/v4/spreadsheets/{self.spreadsheet.id}:batchUpdate",
-                json=body,
-            )
+            if self._pending_requests is not None:
+                self._pending_requests.append(request)
+                return
+            self._post_batch_update([request])
         except Exception as exc:
             logger.warning(
                 "Failed to set column widths for '%s': %s",
@@ -225,7 +755,7 @@ class SheetsClient:
         Set horizontal alignment for a range of columns in the given worksheet.
 
         Columns are 1-based (A=1, B=2, ...), end_col is inclusive.
-        Applies to all rows in those columns.
+        Applies to all rows in those columns. Queued inside format_batch().
         """
         try:
             sheet_id = ws.id
@@ -247,25 +777,21 @@ class SheetsClient:
         # worst case, this just covers more rows than currently used.
         start_row_index = 0
 
-        body = {
-            "requests": [
-                {
-                    "repeatCell": {
-                        "range": {
-                            "sheetId": sheet_id,
-                            "startRowIndex": start_row_index,
-                            "startColumnIndex": start_col_index,
-                            "endColumnIndex": end_col_index,
-                        },
-                        "cell": {
-                            "userEnteredFormat": {
-                                "horizontalAlignment": horizontal.upper(),
-                            }
-                        },
-                        "fields": "userEnteredFormat.horizontalAlignment",
+        request = {
+            "repeatCell": {
+                "range": {
+                    "sheetId": sheet_id,
+                    "startRowIndex": start_row_index,
+                    "startColumnIndex": start_col_index,
+                    "endColumnIndex": end_col_index,
+                },
+                "cell": {
+                    "userEnteredFormat": {
+                        "horizontalAlignment": horizontal.upper(),
                     }
-                }
-            ]
+                },
+                "fields": "userEnteredFormat.horizontalAlignment",
+            }
         }
 
         try:
@@ -276,12 +802,10 @@ class SheetsClient:
                 start_col,
                 end_col,
             )
-            client = self.spreadsheet.client
-            client.request(
-                "post",
-                f"https://sheets.googleapis.com/v4/spreadsheets/{self.spreadsheet.id}:batchUpdate",
-                json=body,
-            )
+            if self._pending_requests is not None:
+                self._pending_requests.append(request)
+                return
+            self._post_batch_update([request])
         except Exception as exc:
             logger.warning(
                 "Failed to set alignment for '%s': %s",
@@ -1,11 +1,17 @@
+import atexit
 import logging
 import os
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, List, Optional
 
 import socketio
 
 logger = logging.getLogger(__name__)
 
+# Send one "<event>_bulk" event carrying every license id instead of one
+# event per license. Only enable once the socket server handles them.
+SOCKET_BULK_EVENTS = os.getenv("SOCKET_BULK_EVENTS", "false").lower() == "true"
+
 
 class SocketClient:
     """
@@ -14,6 +20,10 @@ class SocketClient:
     Provides convenience methods to emit common events like:
       - D_player_restart
       - D_restart_anydesk
+
+    One connection is opened on the first emit and kept open for later
+    ones; a failed emit drops it so the next call reconnects. Emits are
+    serialized, so one instance can be shared across threads.
     """
 
     def __init__(self, url: Optional[str] = None) -> None:
@@ -22,40 +32,144 @@ class SocketClient:
             "SOCKET_URL",
             "https://nctvsocket.n-compass.online",
         )
+        self._sio: Optional[socketio.Client] = None
+        self._lock = threading.Lock()
+        atexit.register(self.close)
 
     # ------------------------------------------------------------------ #
-    # Internal helper
+    # Internal helpers
     # ------------------------------------------------------------------ #
 
+    def _connection(self) -> socketio.Client:
+        """
+        Return the open connection, connecting first if there is none.
+
+        Must be called with self._lock held.
+        """
+        if self._sio is None or not self._sio.connected:
+            self._drop_connection()
+            sio = socketio.Client(reconnection=True, reconnection_attempts=5)
+            sio.connect(self.url, transports=["websocket"])
+            self._sio = sio
+        return self._sio
+
+    def _drop_connection(self) -> None:
+        """Disconnect and forget the current connection, if any."""
+        sio, self._sio = self._sio, None
+        if sio is None:
+            return
+        try:
+            sio.disconnect()
+        except Exception:
+            pass
+
+    def close(self) -> None:
+        """Close the connection. A later emit opens a new one."""
+        with self._lock:
+            self._drop_connection()
+
     def _emit(self, event: str, data: Dict[str, Any]) -> bool:
         """
-        Connects, emits a single event, and disconnects.
+        Emits a single event over the shared connection.
 
         Returns:
             True on success, False on failure.
         """
         logger.info("Socket emit: event=%s data=%s", event, data)
 
-        sio = socketio.Client()
+        with self._lock:
+            try:
+                self._connection().emit(event, data)
+                logger.info("Socket emit succeeded for event=%s", event)
+                return True
+            except Exception as exc:
+                logger.error(
+                    "Socket emit failed for event=%s url=%s error=%s",
+                    event,
+                    self.url,
+                    exc,
+                )
+                self._drop_connection()
+                return False
+
+    def _emit_many(self, event: str, payloads: List[Dict[str, Any]]) -> List[bool]:
+        """
+        Emits `event` once per payload over the shared connection.
 
-        try:
-            sio.connect(self.url, transports=["websocket"])
-            sio.emit(event, data)
-            sio.disconnect()
-            logger.info("Socket emit succeeded for event=%s", event)
-            return True
-        except Exception as exc:
-            logger.error(
-                "Socket emit failed for event=%s url=%s error=%s",
-                event,
-                self.url,
-                exc,
-            )
+        The lock is held for the whole batch, so the events of one call are
+        not interleaved with other emits.
+
+        Returns:
+            One success flag per payload, in order (all False if the
+            connection itself fails).
+        """
+        if not payloads:
+            return []
+
+        logger.info("Socket emit: event=%s x%s", event, len(payloads))
+
+        with self._lock:
             try:
-                sio.disconnect()
-            except Exception:
-                pass
-            return False
+                sio = self._connection()
+            except Exception as exc:
+                logger.error(
+                    "Socket connect failed for event=%s url=%s error=%s",
+                    event,
+                    self.url,
+                    exc,
+                )
+                self._drop_connection()
+                return [False] * len(payloads)
+
+            results: List[bool] = []
+            for data in payloads:
+                try:
+                    sio.emit(event, data)
+                    results.append(True)
+                except Exception as exc:
+                    logger.error(
+                        "Socket emit failed for event=%s data=%s error=%s",
+                        event,
+                        data,
+                        exc,
+                    )
+                    results.append(False)
+
+            if not all(results):
+                # Reconnect on the next call rather than reuse a broken socket
+                self._drop_connection()
+
+        logger.info(
+            "Socket emit finished for event=%s (%s/%s succeeded)",
+            event,
+            sum(results),
+            len(results),
+        )
+        return results
+
+    def _emit_for_licenses(self, event: str, license_ids: List[str]) -> Dict[str, bool]:
+        """
+        Emit `event` for every license_id, as one bulk event when
+        SOCKET_BULK_EVENTS is on, otherwise one event each over the shared
+        connection.
+
+        Returns a mapping of license_id -> whether its event was sent.
+        """
+        ids = [license_id for license_id in license_ids if license_id]
+        if len(ids) != len(license_ids):
+            logger.error("%s called with empty license_id(s); skipping them", event)
+        if not ids:
+            return {}
+
+        if SOCKET_BULK_EVENTS:
+            sent = self._emit(f"{event}_bulk", {"license_ids": ids})
+            return dict.fromkeys(ids, sent)
+
+        sent_each = self._emit_many(
+            event,
+            [{"license_id": license_id} for license_id in ids],
+        )
+        return dict(zip(ids, sent_each))
 
     # ------------------------------------------------------------------ #
     # Public convenience methods
@@ -71,6 +185,15 @@ class SocketClient:
 
         return self._emit("D_player_restart", {"license_id": license_id})
 
+    def restart_players(self, license_ids: List[str]) -> Dict[str, bool]:
+        """
+        Restart every license_id's player with as few socket messages as
+        possible (see SOCKET_BULK_EVENTS).
+
+        Returns a mapping of license_id -> whether its event was sent.
+        """
+        return self._emit_for_licenses("D_player_restart", license_ids)
+
     def restart_anydesk(self, license_id: str) -> bool:
         """
         Emit a D_restart_anydesk event for the given license_id.
@@ -80,3 +203,12 @@ class SocketClient:
             return False
 
         return self._emit("D_restart_anydesk", {"license_id": license_id})
+
+    def restart_anydesks(self, license_ids: List[str]) -> Dict[str, bool]:
+        """
+        Restart AnyDesk for every license_id with as few socket messages as
+        possible (see SOCKET_BULK_EVENTS).
+
+        Returns a mapping of license_id -> whether its event was sent.
+        """
+        return self._emit_for_licenses("D_restart_anydesk", license_ids)
@@ -1,36 +1,50 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Callable
+
+
+def _env(name: str, default: str) -> Callable[[], str]:
+    """default_factory that reads `name` when the settings object is built."""
+    return lambda: os.getenv(name, default)
 
 @dataclass
 class APISettings:
-    base_url: str = os.getenv("NC_API_BASE_URL", "https://nctvapi.n-compass.online")
-    username: str = os.getenv("NC_API_USERNAME", "")
-    password: str = os.getenv("NC_API_PASSWORD", "")
+    base_url: str = field(default_factory=_env("NC_API_BASE_URL", "https://nctvapi.n-compass.online"))
+    username: str = field(default_factory=_env("NC_API_USERNAME", ""))
+    password: str = field(default_factory=_env("NC_API_PASSWORD", ""))
 
 @dataclass
 class SheetsSettings:
-    credentials_file: str = os.getenv("SHEETS_CREDENTIALS_FILE", "client_secret.json")
-    spreadsheet_id: str = os.getenv("SHEETS_SPREADSHEET_ID", "")
+    credentials_file: str = field(default_factory=_env("SHEETS_CREDENTIALS_FILE", "client_secret.json"))
+    spreadsheet_id: str = field(default_factory=_env("SHEETS_SPREADSHEET_ID", ""))
 
 @dataclass
 class SlackSettings:
-    webhook_url: str = os.getenv("SLACK_WEBHOOK_URL", "")
+    webhook_url: str = field(default_factory=_env("SLACK_WEBHOOK_URL", ""))
 
 @dataclass
 class SocketSettings:
-    url: str = os.getenv("SOCKET_URL", "https://nctvsocket.n-compass.online")
+    url: str = field(default_factory=_env("SOCKET_URL", "https://nctvsocket.n-compass.online"))
 
 @dataclass
 class VersionSettings:
-    expected_server_version: str = os.getenv("EXPECTED_SERVER_VERSION", "2.9.4")
-    expected_ui_version: str = os.getenv("EXPECTED_UI_VERSION", "3.0.47")
+    expected_server_version: str = field(default_factory=_env("EXPECTED_SERVER_VERSION", "2.9.4"))
+    expected_ui_version: str = field(default_factory=_env("EXPECTED_UI_VERSION", "3.0.47"))
 
 @dataclass
 class Settings:
-    api: APISettings = APISettings()
-    sheets: SheetsSettings = SheetsSettings()
-    slack: SlackSettings = SlackSettings()
-    socket: SocketSettings = SocketSettings()
-    versions: VersionSettings = VersionSettings()
+    api: APISettings = field(default_factory=APISettings)
+    sheets: SheetsSettings = field(default_factory=SheetsSettings)
+    slack: SlackSettings = field(default_factory=SlackSettings)
+    socket: SocketSettings = field(default_factory=SocketSettings)
+    versions: VersionSettings = field(default_factory=VersionSettings)
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Build the settings from the environment on first use and reuse them.
 
-settings = Settings()
+    Call get_settings.cache_clear() to re-read the environment.
+    """
+    return Settings()
@@ -2,14 +2,19 @@ import logging
 
 from apscheduler.schedulers.base import BaseScheduler
 
-from checks.version_by_zone import run_version_zone_check
-from checks.screenshot_health import run_screenshot_health
-from checks.anydesk_check import run_anydesk_check
-
 logger = logging.getLogger(__name__)
 
+# Seconds each run may be shifted at random, so jobs with aligned
+# intervals don't all hit the Sheets API in the same second
+JOB_JITTER = 30
+HOURLY_JOB_JITTER = 120
+
 
 # --- Jobs --------------------------------------------------------------------
+#
+# Each job imports its check on first run, so the scheduler starts without
+# loading gspread, OCR and image libraries, and an agent that never runs a
+# job (e.g. AnyDesk in the cloud) never imports its dependencies.
 
 
 def job_screenshot_health() -> None:
@@ -21,6 +26,8 @@ def job_screenshot_health() -> None:
       - SheetsClient    (in clients.sheets_client)
       - OCR/image logic (in checks.screenshot_health)
     """
+    from checks.screenshot_health import run_screenshot_health
+
     logger.info("[job_screenshot_health] Starting screenshot health check...")
     run_screenshot_health()
     logger.info("[job_screenshot_health] Finished.")
@@ -35,6 +42,8 @@ def job_version_zone_check() -> None:
       - SheetsClient    (in clients.sheets_client)
       - SocketClient    (in clients.socket_client)
     """
+    from checks.version_by_zone import run_version_zone_check
+
     logger.info("[job_version_zone_check] Starting version-by-zone check...")
     run_version_zone_check()
     logger.info("[job_version_zone_check] Finished.")
@@ -59,6 +68,8 @@ def job_anydesk_check() -> None:
         - An active desktop session
         - Tesseract configured for pytesseract
     """
+    from checks.anydesk_check import run_anydesk_check
+
     logger.info("[job_anydesk_check] Starting AnyDesk connectivity check...")
     run_anydesk_check()
     logger.info("[job_anydesk_check] Finished.")
@@ -84,6 +95,7 @@ def register_jobs(scheduler: BaseScheduler, *, is_anydesk_agent: bool) -> None:
         "interval",
         minutes=5,
         id="screenshot_health",
+        jitter=JOB_JITTER,
         replace_existing=True,
     )
 
@@ -93,6 +105,7 @@ def register_jobs(scheduler: BaseScheduler, *, is_anydesk_agent: bool) -> None:
         "interval",
         minutes=10,
         id="version_zone_check",
+        jitter=JOB_JITTER,
         replace_existing=True,
     )
 
@@ -102,6 +115,7 @@ def register_jobs(scheduler: BaseScheduler, *, is_anydesk_agent: bool) -> None:
         "interval",
         hours=1,
         id="version_sheet_check",
+        jitter=HOURLY_JOB_JITTER,
         replace_existing=True,
     )
 
@@ -112,6 +126,7 @@ def register_jobs(scheduler: BaseScheduler, *, is_anydesk_agent: bool) -> None:
             "interval",
             minutes=5,
             id="anydesk_check",
+            jitter=JOB_JITTER,
             replace_existing=True,
         )
 
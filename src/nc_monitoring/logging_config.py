@@ -1,11 +1,35 @@
+import atexit
 import logging
+import queue
 import sys
+from logging.handlers import QueueHandler, QueueListener
 
 def configure_logging() -> None:
+    """
+    Route log records through a queue so callers never block on stdout.
+
+    The root logger only enqueues records; a QueueListener thread formats
+    and writes them to the real handlers.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(
+        logging.Formatter("%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    )
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    # Drain anything still queued when the process exits
+    atexit.register(listener.stop)
+
+    # QueueHandler merges args (and tracebacks) into the message before
+    # enqueueing; the listener's handler applies the real format.
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.setFormatter(logging.Formatter("%(message)s"))
+
     logging.basicConfig(
         level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(name)s - %(message)s",
         handlers=[
-            logging.StreamHandler(sys.stdout),
+            queue_handler,
         ],
     )
@@ -4,15 +4,33 @@ Entry point for the NC Monitoring service.
 This just:
 1. Configures logging.
 2. Starts the background scheduler defined in scheduler/runner.py.
+
+Pass --force-headers to re-check every sheet header row once instead of
+trusting the header cache saved by earlier runs.
 """
 
+import argparse
+
 from nc_monitoring.logging_config import configure_logging
 from scheduler.runner import start_scheduler
 
 
 def main() -> None:
     """Configure logging and start the scheduler."""
+    parser = argparse.ArgumentParser(description="NC Monitoring service")
+    parser.add_argument(
+        "--force-headers",
+        action="store_true",
+        help="re-check sheet header rows instead of trusting the saved header cache",
+    )
+    args = parser.parse_args()
+
     configure_logging()
+    if args.force_headers:
+        # Imported here so a normal start doesn't load gspread up front
+        from clients.sheets_client import disable_header_cache
+
+        disable_header_cache()
     start_scheduler()
 
 
@@ -1,19 +1,36 @@
 import logging
 import os
-import time
+import signal
+import threading
+
+from apscheduler.executors.pool import ThreadPoolExecutor
 
 from scheduler.background import BackgroundScheduler
 from nc_monitoring.jobs import register_jobs
 
 logger = logging.getLogger(__name__)
 
+# Jobs that may run at the same time. Each check fans out its own API and
+# sheet calls; this only keeps a long run of one job from holding up the
+# others when their intervals overlap.
+SCHEDULER_WORKERS = int(os.getenv("SCHEDULER_WORKERS", "4"))
+
+# POSIX runs signal handlers during a blocking wait; Windows only between
+# waits, so there the main thread still wakes up now and then.
+_IDLE_WAIT_TIMEOUT = 1.0 if os.name == "nt" else None
+
 
 def start_scheduler() -> None:
     """
     Create a BackgroundScheduler, register jobs, and keep the process alive.
     The ANYDESK_AGENT env var controls whether AnyDesk-specific jobs are added.
     """
-    scheduler = BackgroundScheduler()
+    scheduler = BackgroundScheduler(
+        executors={"default": ThreadPoolExecutor(SCHEDULER_WORKERS)},
+        # One run per job at a time, missed runs collapse into one, and a
+        # run that starts up to a minute late still happens
+        job_defaults={"coalesce": True, "max_instances": 1, "misfire_grace_time": 60},
+    )
     is_anydesk_agent = os.getenv("ANYDESK_AGENT", "false").lower() == "true"
 
     register_jobs(scheduler, is_anydesk_agent=is_anydesk_agent)
@@ -21,10 +38,17 @@ def start_scheduler() -> None:
 
     logger.info("Scheduler started (ANYDESK_AGENT=%s)", is_anydesk_agent)
 
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
     try:
-        # Keep the scheduler running in this process
-        while True:
-            time.sleep(1)
+        # Keep the scheduler running in this process until asked to stop
+        while not stop.wait(_IDLE_WAIT_TIMEOUT):
+            pass
     except (KeyboardInterrupt, SystemExit):
-        logger.info("Shutting down scheduler...")
-        scheduler.shutdown()
+        # Ctrl+C / exit that arrived before the handlers took over
+        pass
+
+    logger.info("Shutting down scheduler...")
+    scheduler.shutdown()